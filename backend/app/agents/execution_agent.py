@@ -4,15 +4,25 @@ Execution Agent - 交易执行Agent
 创建时间: 2025-11-07
 """
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from .state import TradingState
-from ..services.trading_agent_service import execute_decision, Decision
+from ..services.trading_agent_service import (
+    execute_decision,
+    Decision,
+    has_open_position_record,
+    reconcile_open_position_records,
+)
+from ..utils.constants import TradingAction, PositionSide
+from ..utils.data_collector import get_exchange, run_exchange_call
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# 同时执行的决策数量上限
+MAX_CONCURRENT_EXECUTIONS = 4
+
 
 async def execution_node(state: TradingState) -> TradingState:
     """
@@ -39,42 +49,100 @@ async def execution_node(state: TradingState) -> TradingState:
             state["execution_results"] = []
             return state
         
-        execution_results = []
         margin_mode = state["risk_params"].get("margin_mode", "CROSSED")
+        session_id = state["session_id"]
+        total = len(decisions)
         
-        for i, decision_dict in enumerate(decisions, 1):
-            logger.info(f"执行决策 [{i}/{len(decisions)}]: {decision_dict['symbol']} {decision_dict['action']}")
-            
-            # 转换为Decision对象
-            decision = Decision(
-                symbol=decision_dict["symbol"],
-                action=decision_dict["action"],
-                reasoning=decision_dict["reasoning"],
-                leverage=decision_dict["leverage"],
-                position_size_usd=decision_dict["position_size_usd"],
-                stop_loss_pct=decision_dict.get("stop_loss_pct"),
-                take_profit_pct=decision_dict.get("take_profit_pct"),
-                stop_loss_price=decision_dict.get("stop_loss_price"),
-                take_profit_price=decision_dict.get("take_profit_price"),
-                confidence=decision_dict["confidence"],
-                risk_usd=decision_dict.get("risk_usd")
-            )
-            
-            # 执行决策
-            result = await execute_decision(
-                decision=decision,
-                session_id=state["session_id"],
-                margin_mode=margin_mode
+        # 按交易对分组：同一交易对的决策保持原有顺序串行执行（如先平仓再开仓），
+        # 不同交易对之间互不依赖，并发执行
+        groups: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        for i, decision_dict in enumerate(decisions):
+            groups.setdefault(decision_dict["symbol"], []).append((i, decision_dict))
+        
+        # 开仓需要最新价计算数量，一次请求批量获取所有涉及交易对的价格
+        open_symbols = list(dict.fromkeys(
+            d["symbol"] for d in decisions if d["action"] in TradingAction.OPEN_ACTIONS
+        ))
+        prices = None
+        if open_symbols:
+            try:
+                prices = await run_exchange_call(get_exchange().get_prices, open_symbols)
+            except Exception as e:
+                # 批量获取失败时退回到逐个查询
+                logger.warning(f"⚠️ 批量获取价格失败，将逐个查询: {e}")
+        
+        # 限制同时下单的数量，避免触发交易所限频
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_EXECUTIONS)
+        results: List[Optional[Dict[str, Any]]] = [None] * total
+        
+        # 每笔平仓成交后在线程中单独写入并提交交易记录，不阻塞其他决策，
+        # 也不攒批：某笔写入失败不会连带丢失其他已成交的记录
+        positions = None
+        has_close = any(d["action"] in TradingAction.CLOSE_ACTIONS for d in decisions)
+        # 对已有开仓记录的方向再次开仓时，需先确认交易所上该持仓仍然存在，否则记录已失效
+        has_tracked_open = any(
+            d["action"] in TradingAction.OPEN_ACTIONS and has_open_position_record(
+                d["symbol"],
+                PositionSide.LONG if d["action"] == TradingAction.OPEN_LONG else PositionSide.SHORT
             )
-            
-            execution_results.append({
-                "decision": decision_dict,
-                "result": result
-            })
-            
-            # 短暂延迟，避免请求过快
-            if result.get('success'):
-                await asyncio.sleep(0.5)
+            for d in decisions
+        )
+        if has_close or has_tracked_open:
+            # 一次请求获取全部持仓，供本周期所有平仓决策使用，并在下单前清理失效的开仓记录
+            try:
+                positions = await run_exchange_call(get_exchange().get_positions)
+                reconcile_open_position_records(positions)
+            except Exception as e:
+                # 批量获取失败时退回到每笔平仓单独查询（开仓记录保持不变）
+                logger.warning(f"⚠️ 批量获取持仓失败，将逐个查询: {e}")
+        
+        async def run_group(items: List[Tuple[int, Dict[str, Any]]]) -> None:
+            for i, decision_dict in items:
+                logger.info(f"执行决策 [{i + 1}/{total}]: {decision_dict['symbol']} {decision_dict['action']}")
+                
+                # 转换为Decision对象
+                decision = Decision(
+                    symbol=decision_dict["symbol"],
+                    action=decision_dict["action"],
+                    reasoning=decision_dict["reasoning"],
+                    leverage=decision_dict["leverage"],
+                    position_size_usd=decision_dict["position_size_usd"],
+                    stop_loss_pct=decision_dict.get("stop_loss_pct"),
+                    take_profit_pct=decision_dict.get("take_profit_pct"),
+                    stop_loss_price=decision_dict.get("stop_loss_price"),
+                    take_profit_price=decision_dict.get("take_profit_price"),
+                    confidence=decision_dict["confidence"],
+                    risk_usd=decision_dict.get("risk_usd")
+                )
+                
+                # 执行决策
+                async with semaphore:
+                    results[i] = await execute_decision(
+                        decision=decision,
+                        session_id=session_id,
+                        margin_mode=margin_mode,
+                        prices=prices,
+                        positions=positions
+                    )
+        
+        group_list = list(groups.values())
+        outcomes = await asyncio.gather(
+            *(run_group(items) for items in group_list),
+            return_exceptions=True
+        )
+        
+        # 某个分组异常时，将其未完成的决策标记为失败
+        for items, outcome in zip(group_list, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"❌ 决策执行异常: {items[0][1]['symbol']} - {outcome}")
+                for i, _ in items:
+                    if results[i] is None:
+                        results[i] = {"success": False, "error": str(outcome)}
+        
+        execution_results = [
+            {"decision": decision_dict, "result": result}
+            for decision_dict, result in zip(decisions, results)
+        ]
         
         logger.info("✅ ExecutionAgent: 交易执行完成")
         
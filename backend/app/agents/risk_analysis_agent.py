@@ -3,7 +3,6 @@ Risk Analysis Agent - 风险分析Agent
 审核交易决策的风险，包括仓位大小、回撤风险、组合风险
 创建时间: 2025-11-12
 """
-import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from decimal import Decimal
@@ -11,6 +10,7 @@ from decimal import Decimal
 from .state import TradingState
 from ..utils.constants import TradingAction, RiskLevel
 from ..exchanges.factory import get_trader
+from ..utils.data_collector import run_exchange_call
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -95,7 +95,7 @@ class RiskAnalyzer:
             
             # 获取账户余额
             try:
-                balance = await asyncio.to_thread(self.trader.get_balance)
+                balance = await run_exchange_call(self.trader.get_balance)
                 if balance:
                     drawdown_pct = (max_loss / balance) * 100
                     risk_result['risk_metrics']['drawdown_pct'] = drawdown_pct
@@ -171,7 +171,7 @@ class RiskAnalyzer:
         try:
             # 获取当前持仓
             if current_positions is None:
-                current_positions = await asyncio.to_thread(self.trader.fetch_positions)
+                current_positions = await run_exchange_call(self.trader.fetch_positions)
             
             # 统计当前持仓
             active_positions = [p for p in current_positions if p.get('contracts', 0) != 0]
@@ -252,7 +252,7 @@ class RiskAnalyzer:
             portfolio_risk['total_risk'] = total_risk
             
             # 获取账户余额计算风险比例
-            balance = await asyncio.to_thread(self.trader.get_balance)
+            balance = await run_exchange_call(self.trader.get_balance)
             if balance:
                 risk_pct = (total_risk / balance) * 100
                 portfolio_risk['metrics']['total_risk_pct'] = risk_pct
@@ -4,7 +4,7 @@ Trading Decision Agent - 交易决策Agent
 创建时间: 2025-11-07
 """
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime
 
 from .state import TradingState
@@ -18,6 +18,28 @@ from ..utils.logging import get_logger
 logger = get_logger(__name__)
 
 
+def _format_decisions(decisions: List[Dict[str, Any]]) -> str:
+    """将决策列表拼接为一条日志文本（每个决策一行：交易对和操作）"""
+    return "\n".join(
+        f"  [{i}] {d['symbol']} - {d['action']}"
+        for i, d in enumerate(decisions, 1)
+    )
+
+
+def _format_decision_details(decisions: List[Dict[str, Any]]) -> str:
+    """将决策理由和开仓参数拼接为一条日志文本（DEBUG 用）"""
+    lines = []
+    for i, d in enumerate(decisions, 1):
+        lines.append(f"  [{i}] {d['symbol']} 理由: {d['reasoning']}")
+        if d['action'] in TradingAction.OPEN_ACTIONS:
+            lines.append(
+                f"      杠杆: {d['leverage']}x, 仓位: ${d['position_size_usd']:.2f}, "
+                f"止损: {d.get('stop_loss_pct')}%, 止盈: {d.get('take_profit_pct')}%, "
+                f"信心度: {d['confidence']}%"
+            )
+    return "\n".join(lines)
+
+
 async def trading_decision_node(state: TradingState) -> TradingState:
     """
     交易决策节点
@@ -59,20 +81,25 @@ async def trading_decision_node(state: TradingState) -> TradingState:
         # 3. 调用AI
         logger.info("🤖 调用AI进行决策...")
         ai_engine = get_llm()
+        # 系统提示词是固定模板（随周期变化的数据都在用户提示词中），放在最前可命中服务端的前缀缓存，
+        # 命中情况见 deepseek llm token 用量日志中的 cache_hit_tokens
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ]
         
         # 使用 asyncio.to_thread 避免阻塞事件循环
-        response = await asyncio.to_thread(ai_engine.chat, messages, temperature=0.3)
+        # 流式接收，JSON 决策代码块闭合后即停止，不再等待模型的尾部输出
+        response = await asyncio.to_thread(
+            ai_engine.chat_until,
+            messages,
+            ResponseParser.has_complete_json_block,
+            temperature=0.3
+        )
         
-        logger.info("✅ AI 调用成功")
-        logger.info("=" * 80)
-        logger.info("💭 AI 分析结果:")
-        logger.info("=" * 80)
-        logger.info(response)
-        logger.info("=" * 80)
+        logger.info(f"✅ AI 调用成功，响应长度: {len(response)} 字符")
+        # 完整响应可达数 KB，且会随决策记录一并入库，只在 DEBUG 级别输出
+        logger.opt(lazy=True).debug("💭 AI 分析结果:\n{}", lambda: response)
         
         # 4. 解析AI响应
         logger.info("🔍 解析AI响应...")
@@ -103,15 +130,13 @@ async def trading_decision_node(state: TradingState) -> TradingState:
         
         logger.info(f"✅ 成功解析 {len(decisions)} 个有效决策")
         
-        # 打印决策列表
-        logger.info(f"📋 决策列表 ({len(decisions)} 个):")
-        for i, d in enumerate(decisions, 1):
-            logger.info(f"  [{i}] {d['symbol']} - {d['action']}")
-            logger.info(f"      理由: {d['reasoning']}")
-            if d['action'] in TradingAction.OPEN_ACTIONS:
-                logger.info(f"      杠杆: {d['leverage']}x, 仓位: ${d['position_size_usd']:.2f}")
-                logger.info(f"      止损: {d.get('stop_loss_pct')}%, 止盈: {d.get('take_profit_pct')}%")
-                logger.info(f"      信心度: {d['confidence']}%")
+        # 打印决策列表：整个列表拼成一条日志输出
+        # INFO 只输出交易对和操作，理由和开仓参数在 DEBUG 级别输出
+        if decisions:
+            logger.info(f"📋 决策列表 ({len(decisions)} 个):\n{_format_decisions(decisions)}")
+            logger.opt(lazy=True).debug("📋 决策详情:\n{}", lambda: _format_decision_details(decisions))
+        else:
+            logger.info("📋 决策列表 (0 个)")
         
         # 5. 更新状态
         state["system_prompt"] = system_prompt
@@ -8,7 +8,7 @@ from fastapi import HTTPException
 from ...schemas.agent import RunAgentRequest
 from ...services.trading_agent_service import get_background_agent_manager
 from ...repositories.trading_session_repo import TradingSessionRepository
-from ...utils.database import get_db
+from ...utils.database import get_session
 from ...utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -37,8 +37,7 @@ async def start_background_agent(
     )
 
     # 步骤1: 验证会话存在且状态正确
-    db = next(get_db())
-    try:
+    with get_session() as db:
         session_repo = TradingSessionRepository(db)
         session = session_repo.get_by_id(session_id)
 
@@ -54,8 +53,6 @@ async def start_background_agent(
                 status_code=400,
                 detail=f"会话状态为 {session.status}，不能启动后台交易"
             )
-    finally:
-        db.close()
 
     try:
         # 步骤2: 获取全局单例的后台交易管理器
@@ -4,7 +4,8 @@
 创建时间: 2025-10-29
 """
 import json
-from fastapi import HTTPException, Depends, Query
+import orjson
+from fastapi import HTTPException, Depends, Query, Response
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
 
@@ -18,6 +19,11 @@ from ...schemas.session import StartSessionRequest, EndSessionRequest
 logger = get_logger(__name__)
 
 
+def _json_response(content: Dict[str, Any]) -> Response:
+    """用 orjson 直接序列化响应，跳过 FastAPI 对大字典逐层执行的 jsonable_encoder"""
+    return Response(content=orjson.dumps(content, default=str), media_type="application/json")
+
+
 async def start_session(
     request: StartSessionRequest,
     db: Session = Depends(get_db)
@@ -240,7 +246,9 @@ async def get_active_session(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"获取活跃会话失败: {str(e)}")
 
 
-async def get_session_list(
+# 以下只读接口内部没有 await，定义为普通函数，由 FastAPI 放到线程池执行，
+# 同步的数据库查询（以及会话详情中的交易所请求）不会阻塞事件循环
+def get_session_list(
     status: Optional[str] = Query(None, description="过滤状态: running, completed, stopped, crashed"),
     limit: int = Query(20, ge=1, le=100, description="返回数量"),
     db: Session = Depends(get_db)
@@ -264,7 +272,7 @@ async def get_session_list(
         raise HTTPException(status_code=500, detail=f"获取会话列表失败: {str(e)}")
 
 
-async def get_session_details(
+def get_session_details(
     session_id: int,
     db: Session = Depends(get_db)
 ):
@@ -277,10 +285,10 @@ async def get_session_details(
         service = TradingSessionService(db)
         details = service.get_session_details(session_id)
 
-        return {
+        return _json_response({
             "success": True,
             "data": details
-        }
+        })
     except BusinessException as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -288,7 +296,7 @@ async def get_session_details(
         raise HTTPException(status_code=500, detail=f"获取会话详情失败: {str(e)}")
 
 
-async def get_ai_decisions(
+def get_ai_decisions(
     session_id: int,
     limit: int = Query(50, ge=1, le=200, description="返回数量"),
     db: Session = Depends(get_db)
@@ -315,7 +323,7 @@ async def get_ai_decisions(
             
             decisions_data.append({
                 "id": d.id,
-                "created_at": d.created_at.isoformat(),
+                "created_at": d.created_at,  # 由 orjson 序列化为 ISO 8601
                 "symbols": symbols,  # 反序列化为数组
                 "decision_type": d.decision_type,
                 "confidence": float(d.confidence) if d.confidence else None,
@@ -327,17 +335,17 @@ async def get_ai_decisions(
                 "execution_result": execution_result  # 反序列化为对象
             })
 
-        return {
+        return _json_response({
             "success": True,
             "data": decisions_data,
             "count": len(decisions_data)
-        }
+        })
     except Exception as e:
         logger.error(f"获取AI决策记录失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取AI决策记录失败: {str(e)}")
 
 
-async def get_asset_timeline(
+def get_asset_timeline(
     session_id: int,
     db: Session = Depends(get_db)
 ):
@@ -356,12 +364,8 @@ async def get_asset_timeline(
 
         decision_repo = AIDecisionRepository(db)
 
-        # 获取所有有账户信息的决策记录（按时间正序）
-        all_decisions = decision_repo.get_by_session(session_id, limit=10000)
-        all_decisions.reverse()  # 转为正序
-
-        # 过滤出有账户信息的记录
-        valid_decisions = [d for d in all_decisions if d.account_balance is not None]
+        # 获取所有有账户信息的决策记录（按时间正序，只查询需要的列）
+        valid_decisions = decision_repo.get_asset_timeline(session_id)
 
         if not valid_decisions:
             return {
@@ -377,21 +381,21 @@ async def get_asset_timeline(
         timeline_data = []
         for d in valid_decisions:
             timeline_data.append({
-                "timestamp": d.created_at.isoformat(),
+                "timestamp": d.created_at,  # 由 orjson 序列化为 ISO 8601
                 "account_balance": float(d.account_balance),
                 "unrealized_pnl": float(d.unrealized_pnl) if d.unrealized_pnl is not None else 0,
                 "total_asset": float(d.total_asset) if d.total_asset is not None else float(d.account_balance),
                 "decision_type": d.decision_type
             })
 
-        return {
+        return _json_response({
             "success": True,
             "data": timeline_data,
             "count": len(timeline_data),
             "metadata": {
                 "total_records": len(valid_decisions)
             }
-        }
+        })
     except Exception as e:
         logger.error(f"获取资产变化时序数据失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取资产变化时序数据失败: {str(e)}")
@@ -416,6 +416,20 @@ class AbstractExchange(ABC):
         """
         pass
     
+    def get_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        批量获取最新成交价
+
+        默认逐个调用 get_ticker，支持批量接口的交易所应覆盖此方法
+
+        Args:
+            symbols: 交易对列表
+
+        Returns:
+            {交易对: 最新价}
+        """
+        return {symbol: self.get_ticker(symbol).get('last') or 0 for symbol in symbols}
+    
     @abstractmethod
     def get_klines(
         self,
@@ -714,6 +714,18 @@ class BinanceExchange(AbstractExchange):
         """
         return self.market_data.get_ticker(symbol)
     
+    def get_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        批量获取最新成交价（单次请求）
+        
+        Args:
+            symbols: 交易对列表
+            
+        Returns:
+            {交易对: 最新价}
+        """
+        return self.market_data.get_prices(symbols)
+    
     def get_klines(
         self,
         symbol: str,
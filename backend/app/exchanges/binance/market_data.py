@@ -198,6 +198,32 @@ class BinanceMarketData:
             logger.exception(error_msg, symbol=symbol)
             raise DataFetchException(error_msg, details={"symbol": symbol}) from e
     
+    def get_prices(self, symbols: List[str]) -> Dict[str, float]:
+        # 批量获取最新价格：单个交易对按 symbol 查询，多个交易对一次拉取全部价格后筛选
+        try:
+            binance_symbols = {self.normalize_symbol(s): s for s in symbols}
+            
+            if len(binance_symbols) == 1:
+                data = [self.client.get_ticker_price(symbol=next(iter(binance_symbols)))]
+            else:
+                data = self.client.get_ticker_price()
+            
+            result = {}
+            for item in data:
+                symbol = binance_symbols.get(item.get('symbol'))
+                if symbol is not None:
+                    result[symbol] = float(item.get('price', 0))
+            
+            logger.debug("成功批量获取最新价格", count=len(result))
+            return result
+            
+        except (RateLimitException, DataFetchException):
+            raise
+        except Exception as e:
+            error_msg = f"批量获取最新价格失败: {str(e)}"
+            logger.exception(error_msg)
+            raise DataFetchException(error_msg, details={"symbols": symbols}) from e
+    
     def get_symbols(self, quote: str = 'USDT', active_only: bool = True) -> List[Dict[str, Any]]:
         # 获取交易对列表
         try:
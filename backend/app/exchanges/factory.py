@@ -6,6 +6,7 @@
 创建时间: 2025-11-01
 修改时间: 2025-11-02 - 移除服务层依赖，专注于交易所实例创建
 """
+import threading
 from typing import Dict, Any, Optional
 from .base import AbstractExchange
 from .binance import BinanceExchange
@@ -37,6 +38,7 @@ class ExchangeFactory:
 
     # 单例实例缓存（只缓存交易所实例）
     _exchange_instance: Optional[AbstractExchange] = None
+    _instance_lock = threading.Lock()
     
     @classmethod
     def register_exchange(cls, name: str, exchange_class: type):
@@ -154,8 +156,11 @@ class ExchangeFactory:
             交易所实例（AbstractExchange）
         """
         if cls._exchange_instance is None:
-            cls._exchange_instance = cls.create_exchange()
-            logger.info(f"交易器创建成功: {cls._exchange_instance.__class__.__name__}")
+            # 双重检查：并发的首次调用只创建一个实例
+            with cls._instance_lock:
+                if cls._exchange_instance is None:
+                    cls._exchange_instance = cls.create_exchange()
+                    logger.info(f"交易器创建成功: {cls._exchange_instance.__class__.__name__}")
         return cls._exchange_instance
 
     @classmethod
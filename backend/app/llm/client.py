@@ -4,7 +4,7 @@ LLM Client - 大语言模型客户端核心
 创建时间: 2025-11-12
 """
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from functools import lru_cache
 
 from ..utils.config import settings
@@ -42,6 +42,29 @@ class LLMBase(ABC):
         """
         pass
     
+    def chat_until(
+        self,
+        messages: List[Dict[str, str]],
+        stop_when: Callable[[str], bool],
+        temperature: float = 0.1,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        调用 LLM 进行对话，已生成内容满足 stop_when 时提前结束
+
+        默认实现不支持流式，等同于 chat；支持流式输出的提供商应覆盖此方法
+
+        Args:
+            messages: 消息列表
+            stop_when: 判断已累积的文本是否已足够，返回 True 即停止接收
+            temperature: 温度参数
+            max_tokens: 最大生成token数
+
+        Returns:
+            LLM 返回的文本内容（提前结束时为已接收部分）
+        """
+        return self.chat(messages, temperature=temperature, max_tokens=max_tokens)
+    
     @abstractmethod
     def get_model_name(self) -> str:
         """获取当前使用的模型名称"""
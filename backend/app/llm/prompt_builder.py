@@ -4,7 +4,7 @@ Prompt Builder Service - 高级用户提示词构建
 创建时间: 2025-10-31
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from datetime import datetime
 from pathlib import Path
 import numpy as np
@@ -13,7 +13,7 @@ from ..utils.data_collector import get_exchange
 from ..utils.indicators import get_indicators_calculator
 from ..repositories.trading_session_repo import TradingSessionRepository
 from ..repositories.trade_repo import TradeRepository
-from ..utils.database import get_db
+from ..utils.database import get_session
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -229,8 +229,7 @@ class PromptDataCollector:
         Returns:
             账户数据
         """
-        db = next(get_db())
-        try:
+        with get_session() as db:
             session_repo = TradingSessionRepository(db)
             trade_repo = TradeRepository(db)
             
@@ -252,13 +251,13 @@ class PromptDataCollector:
                 account_info = self.exchange.get_account_info()
 
                 # 🆕 打印原始账户信息
-                logger.info("=" * 80)
-                logger.info("📊 从交易所获取的原始账户信息:")
-                logger.info(f"  totalWalletBalance: {account_info.get('totalWalletBalance', 'N/A')}")
-                logger.info(f"  availableBalance: {account_info.get('availableBalance', 'N/A')}")
-                logger.info(f"  totalMarginBalance: {account_info.get('totalMarginBalance', 'N/A')}")
-                logger.info(f"  totalUnrealizedProfit: {account_info.get('totalUnrealizedProfit', 'N/A')}")
-                logger.info("=" * 80)
+                logger.debug(
+                    "📊 从交易所获取的原始账户信息: "
+                    f"totalWalletBalance={account_info.get('totalWalletBalance', 'N/A')}, "
+                    f"availableBalance={account_info.get('availableBalance', 'N/A')}, "
+                    f"totalMarginBalance={account_info.get('totalMarginBalance', 'N/A')}, "
+                    f"totalUnrealizedProfit={account_info.get('totalUnrealizedProfit', 'N/A')}"
+                )
 
                 total_equity = float(account_info.get('totalWalletBalance', current_capital))
                 available_balance = float(account_info.get('availableBalance', current_capital))
@@ -310,9 +309,6 @@ class PromptDataCollector:
                     'margin_used_pct': 0.0,
                     'position_count': 0
                 }
-            
-        finally:
-            db.close()
     
     async def _calculate_sharpe_ratio(self, session_id: int) -> float:
         """
@@ -321,47 +317,61 @@ class PromptDataCollector:
         Sharpe Ratio = (平均回报率 - 无风险利率) / 回报率标准差
         简化处理：假设无风险利率为0
         """
-        db = next(get_db())
-        try:
-            trade_repo = TradeRepository(db)
-            
-            # 获取所有已完成的交易
-            trades = trade_repo.get_by_session(session_id)
-            
-            if not trades or len(trades) < 2:
-                return 0.0
-            
-            # 计算每笔交易的回报率
-            returns = []
-            for trade in trades:
-                if trade.pnl and trade.entry_price:
-                    # 计算回报率 = PNL / (entry_price * quantity)
-                    capital_used = float(trade.entry_price) * float(trade.quantity)
-                    if capital_used > 0:
-                        ret = float(trade.pnl) / capital_used
-                        returns.append(ret)
-            
-            if not returns or len(returns) < 2:
-                return 0.0
-            
-            # 计算平均回报率和标准差
-            mean_return = np.mean(returns)
-            std_return = np.std(returns)
-            
-            if std_return == 0:
+        with get_session() as db:
+            try:
+                trade_repo = TradeRepository(db)
+                
+                # 获取所有已完成的交易
+                trades = trade_repo.get_by_session(session_id)
+                
+                if not trades or len(trades) < 2:
+                    return 0.0
+                
+                # 计算每笔交易的回报率
+                returns = []
+                for trade in trades:
+                    if trade.pnl and trade.entry_price:
+                        # 计算回报率 = PNL / (entry_price * quantity)
+                        capital_used = float(trade.entry_price) * float(trade.quantity)
+                        if capital_used > 0:
+                            ret = float(trade.pnl) / capital_used
+                            returns.append(ret)
+                
+                if not returns or len(returns) < 2:
+                    return 0.0
+                
+                # 计算平均回报率和标准差
+                mean_return = np.mean(returns)
+                std_return = np.std(returns)
+                
+                if std_return == 0:
+                    return 0.0
+                
+                # 计算Sharpe Ratio（年化处理可选）
+                sharpe = mean_return / std_return
+                
+                return float(sharpe)
+                
+            except Exception as e:
+                logger.error(f"计算Sharpe Ratio失败: {e}")
                 return 0.0
-            
-            # 计算Sharpe Ratio（年化处理可选）
-            sharpe = mean_return / std_return
-            
-            return float(sharpe)
-            
+
+    async def collect_sentiment(self) -> Tuple[str, str]:
+        """
+        收集市场情绪（恐惧贪婪指数）
+
+        Returns:
+            (指数描述, 交易建议)，获取失败时返回中性默认值
+        """
+        from ..services.sentiment_service import get_market_sentiment
+        try:
+            sentiment = await get_market_sentiment()
+            sentiment_text = f"{sentiment['fear_greed_value']}/100 ({sentiment['fear_greed_label']}) - {sentiment['interpretation']}"
+            return sentiment_text, sentiment['suggestion']
         except Exception as e:
-            logger.error(f"计算Sharpe Ratio失败: {e}")
-            return 0.0
-        finally:
-            db.close()
-    
+            logger.warning(f"⚠️ 获取情绪数据失败: {e}")
+            return "50/100 (Neutral) - 数据暂时不可用", "保持正常交易策略"
+
     async def collect_positions_detail(self) -> List[Dict[str, Any]]:
         """
         从交易所API收集详细的持仓信息（包括清算价格、订单ID等）
@@ -553,7 +563,11 @@ class PromptBuilder:
             logger.info("📦 收集持仓数据...")
             positions = await self.collector.collect_positions_detail()
             positions_text = self._format_positions(positions)
-            
+
+            # 收集市场情绪（放在用户提示词中，系统提示词保持不变）
+            sentiment_text, sentiment_suggestion = await self.collector.collect_sentiment()
+            logger.info(f"📊 市场情绪: {sentiment_text}")
+
             # 填充模板
             prompt = template.format(
                 minutes_since_start=minutes_since_start,
@@ -568,19 +582,19 @@ class PromptBuilder:
                 sharpe_ratio=account_data.get('sharpe_ratio', 0),
                 balance_pct=account_data.get('balance_pct', 0),  # 🆕
                 margin_used_pct=account_data.get('margin_used_pct', 0),  # 🆕
-                position_count=account_data.get('position_count', 0)  # 🆕
+                position_count=account_data.get('position_count', 0),  # 🆕
+                fear_greed_index=sentiment_text,
+                sentiment_suggestion=sentiment_suggestion
             )
 
-            # 🆕 打印账户信息和持仓信息部分
-            logger.info("=" * 80)
-            logger.info("📋 传给AI的账户和持仓信息:")
-            logger.info(f"  净值(account_value): ${account_data.get('account_value', 0):.2f}")
-            logger.info(f"  可用余额(available_cash): ${account_data.get('available_cash', 0):.2f}")
-            logger.info(f"  余额占比(balance_pct): {account_data.get('balance_pct', 0):.1f}%")
-            logger.info(f"  保证金占用(margin_used_pct): {account_data.get('margin_used_pct', 0):.1f}%")
-            logger.info(f"  持仓数量(position_count): {account_data.get('position_count', 0)}")
-            logger.info(f"  持仓详情(positions_detail): {positions_text}")
-            logger.info("=" * 80)
+            # 🆕 打印账户信息和持仓信息部分（持仓详情较长，只在 DEBUG 级别输出）
+            logger.info(
+                f"📋 传给AI的账户信息: 净值=${account_data.get('account_value', 0):.2f}, "
+                f"可用=${account_data.get('available_cash', 0):.2f}, "
+                f"保证金占用={account_data.get('margin_used_pct', 0):.1f}%, "
+                f"持仓数={account_data.get('position_count', 0)}"
+            )
+            logger.opt(lazy=True).debug("📋 持仓详情(positions_detail): {}", lambda: positions_text)
 
             logger.info("✅ 提示词构建完成")
             return prompt
@@ -3,7 +3,7 @@ DeepSeek LLM Provider - DeepSeek 大语言模型实现
 创建时间: 2025-11-12
 """
 from openai import OpenAI
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
 from ..client import LLMBase
 from ...utils.config import settings
@@ -84,6 +84,8 @@ class DeepSeekLLM(LLMBase):
                 stream=False
             )
             
+            self._log_usage(response.usage)
+            
             content = response.choices[0].message.content
             return content
             
@@ -92,6 +94,85 @@ class DeepSeekLLM(LLMBase):
             logger.exception(error_msg)
             raise Exception(error_msg) from e
     
+    def chat_until(
+        self,
+        messages: List[Dict[str, str]],
+        stop_when: Callable[[str], bool],
+        temperature: float = 0.1,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        以流式方式调用 DeepSeek API，满足 stop_when 后立即断开
+        
+        Args:
+            messages: 消息列表
+            stop_when: 判断已累积的文本是否已足够
+            temperature: 温度参数
+            max_tokens: 最大生成token数
+            
+        Returns:
+            LLM 返回的文本内容
+        """
+        try:
+            logger.debug(
+                "流式调用 deepseek llm",
+                messages_count=len(messages),
+                temperature=temperature
+            )
+            
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                # 最后一个分片附带 token 用量（仅在未提前断开时能收到）
+                stream_options={"include_usage": True}
+            )
+            
+            parts: List[str] = []
+            try:
+                for chunk in stream:
+                    if not chunk.choices:
+                        self._log_usage(chunk.usage)
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    # 只有收到代码块结束符时才需要检查，避免每个分片都扫描全文
+                    if '`' in delta and stop_when(''.join(parts)):
+                        logger.debug("deepseek llm 输出已满足条件，提前结束", chunks=len(parts))
+                        break
+            finally:
+                stream.close()
+            
+            return ''.join(parts)
+            
+        except Exception as e:
+            error_msg = f"deepseek llm call failed: {str(e)}"
+            logger.exception(error_msg)
+            raise Exception(error_msg) from e
+    
+    @staticmethod
+    def _log_usage(usage) -> None:
+        """
+        记录 token 用量及前缀缓存命中情况
+        
+        DeepSeek 自动缓存相同的请求前缀（系统提示词在前且跨周期保持不变），
+        命中部分不再重复计算，prompt_cache_hit_tokens 即命中的 token 数；
+        每个决策周期只有一次调用，在 INFO 级别输出以便确认缓存是否生效
+        """
+        if usage is None:
+            return
+        logger.info(
+            "deepseek llm token 用量",
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cache_hit_tokens=getattr(usage, 'prompt_cache_hit_tokens', None),
+            cache_miss_tokens=getattr(usage, 'prompt_cache_miss_tokens', None)
+        )
+    
     def get_model_name(self) -> str:
         """获取当前使用的模型名称"""
         return self.model
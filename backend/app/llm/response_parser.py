@@ -9,17 +9,25 @@ AI Response Parser - 解析AI交易决策响应
 创建时间: 2025-10-31
 """
 
-import json
 import re
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field, asdict
 from decimal import Decimal
 
+import orjson
+
 from ..utils.constants import TradingAction
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# 预编译的提取用正则
+_JSON_CODE_BLOCK_RE = re.compile(r'```json\s*([\s\S]*?)\s*```')
+_CODE_BLOCK_RE = re.compile(r'```\s*([\s\S]*?)\s*```')
+# JSON 对象数组的起始位置: "[" 后（忽略空白）紧跟 "{" 或 "]"
+_JSON_ARRAY_START_RE = re.compile(r'\[\s*[{\]]')
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+
 
 # ==================== 数据结构 ====================
 
@@ -221,6 +229,16 @@ class ResponseParser:
             result.parsing_errors.append(error_msg)
             return result
 
+    @staticmethod
+    def has_complete_json_block(response: str) -> bool:
+        """
+        判断响应中是否已包含完整的 ```json 决策代码块
+
+        系统提示词要求 JSON 决策数组放在最后的 ```json 代码块中，
+        代码块闭合后即可停止接收流式输出
+        """
+        return _JSON_CODE_BLOCK_RE.search(response) is not None
+
     @staticmethod
     def _extract_parts(response: str) -> Tuple[str, str]:
         """
@@ -233,8 +251,7 @@ class ResponseParser:
             (thinking, json_str)
         """
         # 方法1: 查找markdown代码块中的JSON
-        json_code_block_pattern = r'```json\s*([\s\S]*?)\s*```'
-        match = re.search(json_code_block_pattern, response)
+        match = _JSON_CODE_BLOCK_RE.search(response)
 
         if match:
             json_str = match.group(1).strip()
@@ -243,8 +260,7 @@ class ResponseParser:
             return thinking, json_str
 
         # 方法2: 查找普通代码块
-        code_block_pattern = r'```\s*([\s\S]*?)\s*```'
-        match = re.search(code_block_pattern, response)
+        match = _CODE_BLOCK_RE.search(response)
 
         if match:
             potential_json = match.group(1).strip()
@@ -254,7 +270,17 @@ class ResponseParser:
                 logger.debug("✅ 从代码块中提取 JSON")
                 return thinking, potential_json
 
-        # 方法3: 直接查找JSON数组（最宽松）
+        # 方法3: 单遍扫描查找第一个完整的顶层JSON对象数组（忽略正文中的零散括号）
+        match = _JSON_ARRAY_START_RE.search(response)
+        if match:
+            json_end = ResponseParser._find_array_end(response, match.start())
+            if json_end != -1:
+                json_str = response[match.start():json_end + 1]
+                thinking = response[:match.start()].strip()
+                logger.debug("✅ 从响应中扫描到 JSON 数组")
+                return thinking, json_str
+
+        # 方法4: 直接查找首尾方括号（最宽松）
         json_start = response.find('[')
         json_end = response.rfind(']')
 
@@ -268,6 +294,38 @@ class ResponseParser:
         logger.warning("⚠️ 未找到 JSON 数组")
         return response.strip(), ""
 
+    @staticmethod
+    def _find_array_end(text: str, start: int) -> int:
+        """
+        从 start 处的 "[" 开始扫描，返回与之匹配的 "]" 位置
+
+        跟踪字符串字面量和转义，字符串内的括号不计入深度
+
+        Returns:
+            匹配的 "]" 下标，未闭合返回 -1
+        """
+        depth = 0
+        in_string = False
+        escaped = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == '\\':
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == '[' or ch == '{':
+                depth += 1
+            elif ch == ']' or ch == '}':
+                depth -= 1
+                if depth == 0:
+                    return i if ch == ']' else -1
+        return -1
+
     @staticmethod
     def _parse_json(json_str: str) -> Optional[Any]:
         """
@@ -280,17 +338,17 @@ class ResponseParser:
             解析后的对象，失败返回None
         """
         try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as e:
+            return orjson.loads(json_str)
+        except orjson.JSONDecodeError as e:
             logger.error(f"❌ JSON 解析失败: {e}")
             logger.debug(f"JSON 字符串: {json_str[:200]}...")
 
             # 尝试修复常见JSON错误
             try:
                 # 移除尾部逗号
-                fixed_json = re.sub(r',\s*([}\]])', r'\1', json_str)
-                return json.loads(fixed_json)
-            except json.JSONDecodeError:
+                fixed_json = _TRAILING_COMMA_RE.sub(r'\1', json_str)
+                return orjson.loads(fixed_json)
+            except orjson.JSONDecodeError:
                 logger.error("❌ JSON 修复失败")
                 return None
 
@@ -71,7 +71,7 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # 优雅关闭所有后台 Agent
     try:
         from .services.trading_session_service import TradingSessionService
-        from .utils.database import get_db
+        from .utils.database import get_session
         
         logger.info("🛑 开始停止所有后台 Agent...")
         running_agents = manager.list_agents()
@@ -80,42 +80,45 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         # 设置关闭超时时间
         shutdown_timeout = 30  # 30秒超时
         
-        for idx, agent_status in enumerate(running_agents, 1):
-            if agent_status:
-                session_id = agent_status['session_id']
-                logger.info("-" * 60)
-                logger.info(f"🔧 [{idx}/{len(running_agents)}] 停止 Session {session_id}")
-                logger.info(f"   状态: {agent_status.get('status')}")
-                logger.info(f"   运行次数: {agent_status.get('run_count')}")
+        async def stop_agent(idx: int, session_id: int):
+            logger.info(f"🔧 [{idx}/{len(running_agents)}] 停止 Session {session_id}")
+            
+            try:
+                # 异步停止 Agent（带超时）
+                await asyncio.wait_for(
+                    manager.stop_background_agent(session_id),
+                    timeout=shutdown_timeout
+                )
+                logger.info(f"✅ Agent 已停止 (Session {session_id})")
                 
-                try:
-                    # 异步停止 Agent（带超时）
-                    await asyncio.wait_for(
-                        manager.stop_background_agent(session_id),
-                        timeout=shutdown_timeout
-                    )
-                    logger.info(f"✅ Agent 已停止 (Session {session_id})")
+                # 更新会话状态
+                def end_session():
+                    with get_session() as db:
+                        try:
+                            session_service = TradingSessionService(db)
+                            session_service.end_session(
+                                session_id=session_id,
+                                status='stopped',
+                                notes='应用关闭时自动结束'
+                            )
+                            logger.info(f"✅ 会话已关闭 (Session {session_id})")
+                        except Exception as e:
+                            logger.error(f"❌ 关闭会话失败 (Session {session_id}): {str(e)}")
+                
+                await asyncio.to_thread(end_session)
                     
-                    # 更新会话状态
-                    db = next(get_db())
-                    try:
-                        session_service = TradingSessionService(db)
-                        session_service.end_session(
-                            session_id=session_id,
-                            status='stopped',
-                            notes='应用关闭时自动结束'
-                        )
-                        logger.info(f"✅ 会话已关闭 (Session {session_id})")
-                    except Exception as e:
-                        logger.error(f"❌ 关闭会话失败 (Session {session_id}): {str(e)}")
-                    finally:
-                        db.close()
-                        
-                except asyncio.TimeoutError:
-                    logger.error(f"⏱️ 停止 Agent 超时 (Session {session_id})，强制取消")
-                except Exception as e:
-                    logger.error(f"❌ 停止 Agent 失败 (Session {session_id}): {str(e)}")
-                    logger.exception("详细错误:")
+            except asyncio.TimeoutError:
+                logger.error(f"⏱️ 停止 Agent 超时 (Session {session_id})，强制取消")
+            except Exception as e:
+                logger.error(f"❌ 停止 Agent 失败 (Session {session_id}): {str(e)}")
+                logger.exception("详细错误:")
+        
+        # 所有 Agent 都是同一事件循环上的 Task，并发停止，总耗时取决于最慢的一个
+        await asyncio.gather(*(
+            stop_agent(idx, agent_status['session_id'])
+            for idx, agent_status in enumerate(running_agents, 1)
+            if agent_status
+        ))
         
         logger.info("=" * 80)
         logger.info("✅ 所有后台 Agent 已停止")
@@ -324,6 +327,8 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=9527,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        # uvicorn[standard] 自带 uvloop，auto 模式下优先使用（Windows 上回退到 asyncio 默认循环）
+        loop="auto"
     )
 
@@ -46,7 +46,7 @@ class AIDecision(Base):
     # 约束和索引
     __table_args__ = (
         CheckConstraint("decision_type IN ('buy', 'sell', 'hold', 'rebalance', 'close')", name='check_decision_type'),
-        Index('idx_decision_session', 'session_id'),
+        Index('idx_decision_session_created', 'session_id', 'created_at'),  # 按会话过滤并按时间排序
         Index('idx_decision_created_at', 'created_at'),
         Index('idx_decision_executed', 'executed'),
     )
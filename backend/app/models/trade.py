@@ -64,7 +64,7 @@ class Trade(Base):
     __table_args__ = (
         CheckConstraint("side IN ('long', 'short')", name='check_trade_side'),
         CheckConstraint("order_type IN ('market', 'limit', 'stop', 'stop_limit')", name='check_trade_order_type'),
-        Index('idx_trade_session', 'session_id'),
+        Index('idx_trade_session_created', 'session_id', 'created_at'),  # 按会话过滤并按时间倒序分页
         Index('idx_trade_symbol_created', 'symbol', 'created_at'),
         Index('idx_trade_created_at', 'created_at'),
     )
@@ -3,10 +3,10 @@ AI 决策 Repository
 管理 AI 交易决策的数据访问层，记录和查询基于会话的 AI 决策
 修改时间: 2025-10-29 (添加会话支持)
 """
-import json
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy import desc
+import orjson
 
 from ..models.ai_decision import AIDecision
 from ..utils.logging import get_logger
@@ -14,6 +14,11 @@ from ..utils.logging import get_logger
 logger = get_logger(__name__)
 
 
+def _dumps(value: Any) -> str:
+    """序列化为 JSON 字符串（orjson，无法识别的类型如 Decimal/datetime 转为字符串）"""
+    return orjson.dumps(value, default=str).decode()
+
+
 class AIDecisionRepository:
     """AI 决策数据访问层"""
     
@@ -22,7 +27,7 @@ class AIDecisionRepository:
     
     def get_by_id(self, id: int) -> Optional[AIDecision]:
         """根据 ID 获取 AI 决策"""
-        return self.db.query(AIDecision).filter(AIDecision.id == id).first()
+        return self.db.get(AIDecision, id)
     
     def save_decision(
         self,
@@ -41,9 +46,9 @@ class AIDecisionRepository:
     ) -> AIDecision:
         try:
             # 序列化 JSON 字段（SQLite 兼容）
-            symbols_json = json.dumps(symbols) if symbols else None
-            prompt_data_json = json.dumps(prompt_data) if prompt_data else None
-            suggested_actions_json = json.dumps(suggested_actions or [])
+            symbols_json = _dumps(symbols) if symbols else None
+            prompt_data_json = _dumps(prompt_data) if prompt_data else None
+            suggested_actions_json = _dumps(suggested_actions or [])
 
             decision = AIDecision(
                 session_id=session_id,
@@ -88,4 +93,48 @@ class AIDecisionRepository:
             .order_by(desc(AIDecision.created_at))\
             .limit(limit)\
             .all()
-
+    
+    def get_summaries_by_session(
+        self,
+        session_id: int,
+        limit: int = 100
+    ) -> List[AIDecision]:
+        """
+        获取会话的决策摘要（只加载列表展示用到的列）
+        
+        不加载 prompt_data、ai_response、suggested_actions 等大文本列，
+        每条决策的完整提示词可达数十 KB，会话详情页用不到
+        """
+        return self.db.query(AIDecision)\
+            .options(load_only(
+                AIDecision.id,
+                AIDecision.decision_type,
+                AIDecision.symbols,
+                AIDecision.confidence,
+                AIDecision.reasoning,
+                AIDecision.created_at
+            ))\
+            .filter(AIDecision.session_id == session_id)\
+            .order_by(desc(AIDecision.created_at))\
+            .limit(limit)\
+            .all()
+    
+    def get_asset_timeline(self, session_id: int) -> List[Any]:
+        """
+        获取会话的资产变化记录（按时间正序，只含有账户信息的决策）
+        
+        过滤和排序在数据库端完成，只查询时序图用到的列
+        """
+        return self.db.query(
+            AIDecision.created_at,
+            AIDecision.account_balance,
+            AIDecision.unrealized_pnl,
+            AIDecision.total_asset,
+            AIDecision.decision_type
+        )\
+            .filter(
+                AIDecision.session_id == session_id,
+                AIDecision.account_balance.isnot(None)
+            )\
+            .order_by(AIDecision.created_at)\
+            .all()
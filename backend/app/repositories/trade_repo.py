@@ -3,9 +3,9 @@
 管理交易记录的数据访问层，支持基于会话的交易记录管理
 创建时间: 2025-10-29
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func, case
 from decimal import Decimal
 from datetime import datetime
 
@@ -23,7 +23,7 @@ class TradeRepository:
     
     def get_by_id(self, id: int) -> Optional[Trade]:
         """根据 ID 获取交易记录"""
-        return self.db.query(Trade).filter(Trade.id == id).first()
+        return self.db.get(Trade, id)
     
     def create_closed_trade(
         self,
@@ -67,8 +67,8 @@ class TradeRepository:
             创建的 Trade 实例
         """
         try:
-            # 计算持仓时长
-            holding_duration = exit_time - entry_time
+            # 计算持仓时长（秒，与模型的 Integer 列一致）
+            holding_duration = int((exit_time - entry_time).total_seconds())
 
             # 计算总手续费
             total_fees = Decimal(0)
@@ -178,18 +178,34 @@ class TradeRepository:
         return self.get_by_session(session_id, limit)
     
     def get_session_statistics(self, session_id: int) -> dict:
-        trades = self.get_by_session(session_id, limit=10000)
-        
-        total_trades = len(trades)
-        winning_trades = len([t for t in trades if t.pnl and t.pnl > 0])
-        losing_trades = len([t for t in trades if t.pnl and t.pnl < 0])
-        
-        total_pnl = sum([t.pnl for t in trades if t.pnl]) or Decimal(0)
+        # 在数据库端聚合，一条查询返回一行，无需加载全部交易记录
+        total_trades, winning_trades, losing_trades, total_pnl = self.db.query(
+            func.count(Trade.id),
+            func.sum(case((Trade.pnl > 0, 1), else_=0)),
+            func.sum(case((Trade.pnl < 0, 1), else_=0)),
+            func.sum(Trade.pnl)
+        ).filter(Trade.session_id == session_id).one()
         
         return {
             "total_trades": total_trades,
-            "winning_trades": winning_trades,
-            "losing_trades": losing_trades,
-            "total_pnl": total_pnl
+            "winning_trades": winning_trades or 0,
+            "losing_trades": losing_trades or 0,
+            "total_pnl": total_pnl or Decimal(0)
         }
+    
+    def get_hold_time_sums(self, session_id: int) -> Dict[str, int]:
+        """
+        按方向汇总会话内已平仓交易的持仓时长（秒）
+        
+        直接对 holding_duration 列求和，不加载交易记录
+        """
+        rows = self.db.query(Trade.side, func.sum(Trade.holding_duration))\
+            .filter(
+                Trade.session_id == session_id,
+                Trade.holding_duration.isnot(None)
+            )\
+            .group_by(Trade.side)\
+            .all()
+        
+        return {side: total or 0 for side, total in rows}
 
@@ -6,13 +6,18 @@
 import json
 from typing import Optional, List
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy import desc
 from decimal import Decimal
 
 from ..models.trading_session import TradingSession
 
 
+def _to_decimal(value) -> Decimal:
+    """转换为 Decimal；已是 Decimal 时直接返回，不再经过字符串转换"""
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
 class TradingSessionRepository:
     """交易会话数据访问层"""
     
@@ -20,14 +25,18 @@ class TradingSessionRepository:
         self.db = db
     
     def get_by_id(self, id: int) -> Optional[TradingSession]:
-        return self.db.query(TradingSession).filter(TradingSession.id == id).first()
+        return self.db.get(TradingSession, id)
     
     def update(self, id: int, **kwargs) -> Optional[TradingSession]:
         session = self.get_by_id(id)
         if not session:
             return None
         
-        for key, value in kwargs.items():
+        return self._apply(session, kwargs)
+    
+    def _apply(self, session: TradingSession, values: dict) -> TradingSession:
+        """将字段写入已加载的会话并提交（一次事务）"""
+        for key, value in values.items():
             if hasattr(session, key):
                 setattr(session, key, value)
         
@@ -45,6 +54,28 @@ class TradingSessionRepository:
             desc(TradingSession.created_at)
         ).limit(limit).all()
     
+    def get_summaries(self, status: Optional[str] = None, limit: int = 20) -> List[TradingSession]:
+        """
+        获取会话列表摘要（按创建时间倒序，只加载列表展示用到的列）
+        
+        不加载 config、trading_params、notes 等文本列；状态过滤和数量限制都在数据库端完成
+        """
+        query = self.db.query(TradingSession).options(load_only(
+            TradingSession.id,
+            TradingSession.session_name,
+            TradingSession.status,
+            TradingSession.created_at,
+            TradingSession.ended_at,
+            TradingSession.initial_capital,
+            TradingSession.final_capital,
+            TradingSession.total_pnl,
+            TradingSession.total_return_pct,
+            TradingSession.total_trades
+        ))
+        if status:
+            query = query.filter(TradingSession.status == status)
+        return query.order_by(desc(TradingSession.created_at)).limit(limit).all()
+    
     def get_by_status(self, status: str) -> List[TradingSession]:
         return self.db.query(TradingSession).filter(
             TradingSession.status == status
@@ -56,7 +87,7 @@ class TradingSessionRepository:
         initial_capital: Optional[float] = None,
         config: Optional[dict] = None
     ) -> TradingSession:
-        initial_cap = Decimal(str(initial_capital)) if initial_capital else None
+        initial_cap = _to_decimal(initial_capital) if initial_capital else None
 
         # 将 config 字典序列化为 JSON 字符串（SQLite 兼容）
         config_json = json.dumps(config) if config else None
@@ -78,8 +109,14 @@ class TradingSessionRepository:
         session_id: int,
         status: str = 'completed',
         final_capital: Optional[float] = None,
-        total_pnl: Optional[float] = None
+        total_pnl: Optional[float] = None,
+        **extra
     ) -> Optional[TradingSession]:
+        """
+        结束会话
+        
+        extra 中的其他字段（统计数据、备注等）与状态一起在同一次提交中写入
+        """
         session = self.get_by_id(session_id)
         if not session:
             return None
@@ -90,20 +127,20 @@ class TradingSessionRepository:
         }
         
         if final_capital is not None:
-            update_data['final_capital'] = Decimal(str(final_capital))
+            update_data['final_capital'] = _to_decimal(final_capital)
             
         if total_pnl is not None:
-            update_data['total_pnl'] = Decimal(str(total_pnl))
+            update_data['total_pnl'] = _to_decimal(total_pnl)
             
         if final_capital and session.initial_capital:
-            # 将所有值转换为 float 进行计算，然后转回 Decimal
-            final_cap_float = float(final_capital) if isinstance(final_capital, Decimal) else final_capital
-            initial_cap_float = float(session.initial_capital)
-            update_data['total_return_pct'] = Decimal(str(
-                (final_cap_float - initial_cap_float) / initial_cap_float * 100
-            ))
+            # 直接用 Decimal 计算收益率，无需在 float 和字符串之间来回转换
+            final_cap = _to_decimal(final_capital)
+            update_data['total_return_pct'] = (
+                (final_cap - session.initial_capital) / session.initial_capital * 100
+            )
         
-        return self.update(session_id, **update_data)
+        update_data.update(extra)
+        return self._apply(session, update_data)
     
     def update_statistics(
         self,
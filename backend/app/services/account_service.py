@@ -4,12 +4,17 @@
 创建时间: 2025-11-01
 修改时间: 2025-11-02 - 重构依赖关系，移除循环依赖
 """
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from ..exchanges.base import AbstractExchange
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# 持仓缓存有效期（秒）：前端轮询的并发请求在有效期内共用一次交易所查询
+POSITIONS_CACHE_TTL = 3.0
+
 
 class AccountService:
     """
@@ -31,6 +36,9 @@ class AccountService:
             exchange: 交易所实例（实现 AbstractExchange 接口）
         """
         self.exchange = exchange
+        # (获取时间, 持仓列表)
+        self._positions_cache: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+        self._positions_lock = threading.Lock()
         logger.info(f"账户服务初始化完成，使用交易所: {exchange.__class__.__name__}")
 
     @classmethod
@@ -64,11 +72,25 @@ class AccountService:
             raise
 
     def get_positions(self) -> List[Dict[str, Any]]:
-        try:
-            return self.exchange.get_positions()
-        except Exception as e:
-            logger.error(f"获取持仓信息失败: {str(e)}")
-            raise
+        """
+        获取持仓信息（缓存 POSITIONS_CACHE_TTL 秒）
+
+        只供界面展示使用，交易执行直接查询交易所，不经过此缓存。
+        查询期间持有锁，同时到达的请求等待并复用同一次查询结果
+        """
+        with self._positions_lock:
+            cached = self._positions_cache
+            if cached is not None and time.monotonic() - cached[0] < POSITIONS_CACHE_TTL:
+                return cached[1]
+
+            try:
+                positions = self.exchange.get_positions()
+            except Exception as e:
+                logger.error(f"获取持仓信息失败: {str(e)}")
+                raise
+
+            self._positions_cache = (time.monotonic(), positions)
+            return positions
 
     # 获取账户摘要信息（账户信息 + 持仓信息）
     def get_account_summary(self) -> Dict[str, Any]:
@@ -2,36 +2,58 @@
 Trading Agent Service
 核心逻辑：数据收集 -> AI分析决策 -> 执行交易 -> 记录保存
 创建时间: 2025-10-30
+
+说明：本模块是纯编排代码（异步 I/O、数据库、JSON），没有数值计算内循环，
+因此不引入 Numba 等 JIT；指标类数值计算集中在 utils/indicators.py
 """
 
 import json
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timezone
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone, timedelta
 from decimal import Decimal
+from functools import lru_cache
 import time
 import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
+from types import MappingProxyType
+
+from sqlalchemy import func
 
 from ..utils.constants import TradingAction, PositionSide
-from ..utils.data_collector import get_exchange
-from ..llm import get_llm
-from ..llm.prompt_builder import build_user_prompt
+from ..utils.data_collector import get_exchange, run_exchange_call
 from ..exchanges.factory import get_trader
 from ..exchanges.base import PositionSide as TraderPositionSide
-from ..llm.response_parser import ResponseParser
 from ..repositories.trade_repo import TradeRepository
 from ..repositories.ai_decision_repo import AIDecisionRepository
 from ..repositories.trading_session_repo import TradingSessionRepository
-from ..utils.database import get_db
+from ..models.trading_session import TradingSession
+from ..utils.database import get_session
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# 后台循环中回查数据库会话状态的最小间隔（秒）
+# 正常结束会话时 end_session 会通过取消信号立即停止循环，这里只兜底处理被外部结束的会话
+# （其他进程、手动改库或未经 stop_background_agent 的异常路径），间隔需足够短以免继续下单
+SESSION_CHECK_INTERVAL = 30
+
+# 未指定风险参数时使用的默认值（启动时复制一份，避免共享可变对象）
+DEFAULT_RISK_PARAMS: Dict[str, Any] = {
+    "max_position_size": 0.2,
+    "stop_loss_pct": 0.05,
+    "take_profit_pct": 0.10,
+    "max_leverage": 3
+}
+
 
 # ==================== 数据结构定义 ====================
 
 class TradingContext:
     """交易上下文"""
+
+    __slots__ = ('current_time', 'call_count', 'session_id', 'symbols', 'risk_params')
     
     def __init__(self):
         self.current_time: str = ""
@@ -58,6 +80,12 @@ class TradingContext:
 class Decision:
     """AI 决策"""
 
+    __slots__ = (
+        'symbol', 'action', 'reasoning', 'leverage', 'position_size_usd',
+        'stop_loss_pct', 'take_profit_pct', 'stop_loss_price', 'take_profit_price',
+        'confidence', 'risk_usd'
+    )
+
     def __init__(
         self,
         symbol: str,
@@ -109,172 +137,233 @@ class Decision:
         return result
 
 
+@dataclass(frozen=True, slots=True)
+class AgentSnapshot:
+    """
+    后台 Agent 状态快照（不可变）
+
+    状态写入时整体失效、读取时重建后整体替换，读取方无需加锁
+    """
+    session_id: int
+    status: str
+    started_at: Optional[str]
+    stopped_at: Optional[str]
+    last_run_time: Optional[str]
+    run_count: int
+    symbols: Tuple[str, ...]
+    decision_interval: int
+    risk_params: Dict[str, Any]
+    last_error: Optional[str]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为接口返回格式"""
+        return {
+            'session_id': self.session_id,
+            'status': self.status,
+            'started_at': self.started_at,
+            'stopped_at': self.stopped_at,
+            'last_run_time': self.last_run_time,
+            'run_count': self.run_count,
+            'config': {
+                'symbols': list(self.symbols),
+                'decision_interval': self.decision_interval,
+                'risk_params': dict(self.risk_params)
+            },
+            'last_error': self.last_error
+        }
+
+
 # ==================== AI 决策函数 ====================
 
-async def build_system_prompt(risk_params: Dict[str, Any], session_id: int) -> str:
-    """构建系统提示词"""
-    # 从文件加载提示词模板
-    prompt_file = Path(__file__).parent.parent / "prompts" / "trading_system_prompt.txt"
-    
-    with open(prompt_file, 'r', encoding='utf-8') as f:
-        template = f.read()
-
-    # 获取账户净值
-    from .account_service import AccountService
-    account_service = AccountService.get_instance()
-    account_info = account_service.get_account_info()
-    account_equity = account_info.get('totalMarginBalance', 10000)  # 默认10000
-    
-    # 计算仓位和杠杆值
-    altcoin_min = account_equity * 0.8
-    altcoin_max = account_equity * 1.5
-    altcoin_leverage = risk_params.get('altcoin_leverage', 5)
-    
-    btc_eth_min = account_equity * 5
-    btc_eth_max = account_equity * 10
-    btc_eth_leverage = risk_params.get('btc_eth_leverage', 3)
-    
-    # 获取市场情绪数据
-    from .sentiment_service import get_market_sentiment
-    try:
-        sentiment = await get_market_sentiment()
-        sentiment_text = f"{sentiment['fear_greed_value']}/100 ({sentiment['fear_greed_label']}) - {sentiment['interpretation']}"
-        sentiment_suggestion = sentiment['suggestion']
-    except Exception as e:
-        logger.warning(f"⚠️ 获取情绪数据失败: {e}")
-        sentiment_text = "50/100 (Neutral) - 数据暂时不可用"
-        sentiment_suggestion = "保持正常交易策略"
-    
-    # 使用字符串替换，以支持特殊字符的占位符
-    prompt = template
-    prompt = prompt.replace('{账户净值*0.8}', f'{altcoin_min:.0f}')
-    prompt = prompt.replace('{账户净值*1.5}', f'{altcoin_max:.0f}')
-    prompt = prompt.replace('{山寨币杠杆}', str(altcoin_leverage))
-    prompt = prompt.replace('{账户净值*5}', f'{btc_eth_min:.0f}')
-    prompt = prompt.replace('{账户净值*10}', f'{btc_eth_max:.0f}')
-    prompt = prompt.replace('{BTC/ETH杠杆}', str(btc_eth_leverage))
-    prompt = prompt.replace('{fear_greed_index}', sentiment_text)
-    prompt = prompt.replace('{sentiment_suggestion}', sentiment_suggestion)
-    
-    logger.info(f"✅ 系统提示词加载成功，账户净值: {account_equity:.2f}")
-    logger.info(f"📊 市场情绪: {sentiment_text}")
-    
-    return prompt
+_SYSTEM_PROMPT_FILE = Path(__file__).parent.parent / "prompts" / "trading_system_prompt.txt"
 
 
-def parse_ai_response(response: str) -> List[Decision]:
+@lru_cache(maxsize=1)
+def _load_prompt_template(path: Path) -> str:
     """
-    解析 AI 响应，提取决策列表
+    读取提示词模板文件
 
-    Args:
-        response: AI 响应文本
+    模板运行期间不会变化，缓存后每个决策周期无需重复读盘
+    """
+    return path.read_text(encoding='utf-8')
 
-    Returns:
-        决策列表
+
+async def build_system_prompt(risk_params: Dict[str, Any], session_id: int) -> str:
     """
-    logger.info("🔍 开始解析 AI 响应")
+    构建系统提示词
 
-    try:
-        # 使用新的解析器
-        parsed = ResponseParser.parse(response)
-
-        # 如果有解析错误，记录日志
-        if parsed.parsing_errors:
-            logger.warning(f"⚠️ 解析过程中出现错误:")
-            for error in parsed.parsing_errors:
-                logger.warning(f"  - {error}")
-
-        # 转换为Decision对象（保持兼容性）
-        decisions = []
-        for parsed_decision in parsed.decisions:
-            decision = Decision(
-                symbol=parsed_decision.symbol,
-                action=parsed_decision.action,
-                reasoning=parsed_decision.reasoning,
-                leverage=parsed_decision.leverage,
-                position_size_usd=parsed_decision.position_size_usd,
-                stop_loss_pct=parsed_decision.stop_loss_pct,
-                take_profit_pct=parsed_decision.take_profit_pct,
-                stop_loss_price=parsed_decision.stop_loss,
-                take_profit_price=parsed_decision.take_profit,
-                confidence=parsed_decision.confidence,
-                risk_usd=parsed_decision.risk_usd
-            )
-            decisions.append(decision)
+    系统提示词不含任何随周期变化的内容（账户、行情、市场情绪都放在用户提示词中），
+    每个周期逐字节相同，可命中 LLM 服务端的前缀缓存
+    """
+    prompt = _load_prompt_template(_SYSTEM_PROMPT_FILE)
+    logger.info("✅ 系统提示词加载成功")
+    return prompt
 
-        logger.info(f"✅ 成功解析 {len(decisions)} 个有效决策")
 
-        # 记录思维链（如果有）
-        if parsed.thinking:
-            logger.info(f"💭 AI 思维链摘要: {parsed.thinking[:200]}...")
+# ==================== 决策执行函数 ====================
 
-        return decisions
+@dataclass(slots=True)
+class OpenPositionRecord:
+    """本进程内开仓成交的记录，平仓时用于生成交易记录"""
+    entry_time: datetime
+    entry_order_id: Optional[str]
+    entry_fee: Decimal
 
-    except Exception as e:
-        logger.exception(f"❌ 解析 AI 响应失败: {e}")
-        return []
 
+# 开仓记录 {(交易对, 方向): 记录}
+# 币安持仓接口不返回开仓时间和开仓订单，开仓时记下，平仓时取出；进程重启后丢失，平仓时退回估算
+_open_position_records: Dict[Tuple[str, str], OpenPositionRecord] = {}
 
-async def get_ai_decision(
-    context: TradingContext,
-    start_time: datetime
-) -> tuple[str, List[Decision], str]:
+
+def has_open_position_record(symbol: str, side: str) -> bool:
+    """是否有该交易对、方向的开仓记录"""
+    return (symbol, side) in _open_position_records
+
+
+def reconcile_open_position_records(positions: List[Dict[str, Any]]) -> None:
     """
-    调用 AI 获取交易决策（一次性调用）
+    按交易所持仓清理失效的开仓记录
+
+    开仓记录只在本进程平仓时移除；强平、在交易所手动平仓或平仓记录写入失败后，
+    记录会残留，下次同方向开仓会被当作加仓，沿用旧的开仓时间和订单并累加无关的手续费。
+    需在本周期下单前调用：交易所已无对应持仓的记录一律丢弃
+    """
+    held = {
+        (pos.get('symbol'), pos.get('side'))
+        for pos in positions
+        if float(pos.get('quantity', 0)) != 0
+    }
+    for key in [key for key in _open_position_records if key not in held]:
+        del _open_position_records[key]
+        logger.info(f"🧹 交易所已无持仓，丢弃开仓记录: {key[0]} {key[1]}")
+
+
+def _record_open_position(symbol: str, side: str, order_result) -> None:
+    """记录一次开仓成交；对已有持仓加仓时保留最早的开仓时间和订单，累加手续费"""
+    fee = Decimal(str(order_result.fee)) if order_result.fee else Decimal(0)
+    record = _open_position_records.get((symbol, side))
+    if record is not None:
+        record.entry_fee += fee
+        return
+
+    if order_result.timestamp:
+        entry_time = datetime.fromtimestamp(order_result.timestamp / 1000, tz=timezone.utc)
+    else:
+        entry_time = datetime.now(timezone.utc)
+    _open_position_records[(symbol, side)] = OpenPositionRecord(
+        entry_time=entry_time,
+        entry_order_id=order_result.order_id,
+        entry_fee=fee
+    )
+
+
+async def _open_position(
+    decision: Decision,
+    trader,
+    margin_mode: str,
+    prices: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    执行开仓决策（开多/开空共用）
     
     Args:
-        context: 交易上下文
-        start_time: 交易开始时间
+        decision: 开仓决策（open_long / open_short）
+        trader: 交易器
+        margin_mode: 保证金模式
+        prices: 本周期预先批量获取的最新价
         
     Returns:
-        (AI 完整响应, 决策列表, 用户提示词)
+        执行结果
     """
-    logger.info("🤖 开始调用 AI 进行决策")
+    is_long = decision.action == TradingAction.OPEN_LONG
     
-    try:
-        # 构建系统提示词
-        system_prompt = await build_system_prompt(context.risk_params, context.session_id)
-        
-        logger.info("📝 构建用户提示词")
-        user_prompt = await build_user_prompt(
-            session_id=context.session_id,
-            symbols=context.symbols,
-            call_count=context.call_count,
-            start_time=start_time
-        )
-        
-        # 调用 AI
-        ai_engine = get_llm()
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
-        
-        # 使用 asyncio.to_thread 将同步调用转为异步，避免阻塞事件循环
-        response = await asyncio.to_thread(ai_engine.chat, messages, temperature=0.3)
-        
-        logger.info("✅ AI 调用成功")
-        logger.debug(f"AI 响应: {response}")
-        
-        # 解析决策
-        decisions = parse_ai_response(response)
-        
-        return response, decisions, user_prompt
-        
-    except Exception as e:
-        logger.error(f"❌ AI 调用失败: {e}")
-        raise
-
-
-# ==================== 决策执行函数 ====================
-
-async def execute_decision(decision: Decision, session_id: int, margin_mode: str = 'CROSSED') -> Dict[str, Any]:
+    # 获取当前价格用于计算数量（优先使用本周期批量获取的价格）
+    current_price = prices.get(decision.symbol) if prices else None
+    if not current_price:
+        exchange = get_exchange()
+        # 在交易所线程池中执行，避免阻塞事件循环
+        ticker = await run_exchange_call(exchange.get_ticker, decision.symbol)
+        current_price = ticker.get('last') or 0
+    
+    # 计算开仓数量
+    quantity = decision.position_size_usd / current_price if current_price > 0 else 0
+    
+    if quantity <= 0:
+        return {"success": False, "error": "数量无效"}
+    
+    # 计算止损止盈价格（优先使用绝对价格，其次使用百分比）
+    # 仅作为参考值传给交易器、不下委托单，直接用 float 计算，无需 Decimal
+    # 做多：止损在下方、止盈在上方；做空相反
+    direction = 1 if is_long else -1
+    
+    stop_loss_price = decision.stop_loss_price
+    if stop_loss_price is None and decision.stop_loss_pct is not None:
+        stop_loss_price = current_price * (1 - direction * decision.stop_loss_pct / 100)
+    
+    take_profit_price = decision.take_profit_price
+    if take_profit_price is None and decision.take_profit_pct is not None:
+        take_profit_price = current_price * (1 + direction * decision.take_profit_pct / 100)
+    
+    if is_long:
+        logger.info(f"📈 开多仓: {decision.symbol} 数量={quantity:.6f}, 保证金模式={margin_mode}")
+        open_func = trader.open_long
+        label = "开多仓"
+    else:
+        logger.info(f"📉 开空仓: {decision.symbol} 数量={quantity:.6f}, 保证金模式={margin_mode}")
+        open_func = trader.open_short
+        label = "开空仓"
+    
+    # 在交易所线程池中执行，避免阻塞事件循环
+    order_result = await run_exchange_call(
+        open_func,
+        symbol=decision.symbol,
+        quantity=quantity,
+        leverage=decision.leverage,
+        stop_loss_price=stop_loss_price,
+        take_profit_price=take_profit_price,
+        margin_mode=margin_mode
+    )
+    
+    if not order_result.success:
+        logger.error(f"❌ {label}失败: {order_result.error}")
+        return {"success": False, "error": order_result.error}
+    
+    # 不创建交易记录，持仓信息从交易所API获取
+    # 只有平仓时才创建完整的交易记录，这里只记下开仓时间和订单供平仓时使用
+    _record_open_position(decision.symbol, PositionSide.LONG if is_long else PositionSide.SHORT, order_result)
+    
+    logger.info(f"✅ {label}成功: {decision.symbol}, 订单ID={order_result.order_id}")
+    return {
+        "success": True,
+        "action": decision.action,
+        "order_id": order_result.order_id,
+        "entry_price": float(order_result.avg_price or current_price),
+        "quantity": float(order_result.filled_quantity or quantity)
+    }
+
+
+def _persist_closed_trade(trade_fields: Dict[str, Any]):
+    """在独立会话中写入一条已平仓交易记录（同步，供线程中调用）"""
+    with get_session() as db:
+        return TradeRepository(db).create_closed_trade(**trade_fields)
+
+
+async def execute_decision(
+    decision: Decision,
+    session_id: int,
+    margin_mode: str = 'CROSSED',
+    prices: Optional[Dict[str, float]] = None,
+    positions: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
     """
     执行单个决策（使用真实交易）
     
     Args:
         decision: 决策对象
         session_id: 交易会话 ID
+        margin_mode: 保证金模式
+        prices: 本周期预先批量获取的最新价 {交易对: 价格}，缺失时单独查询
+        positions: 本周期预先获取的持仓列表，为空时平仓前单独查询
         
     Returns:
         执行结果
@@ -282,235 +371,116 @@ async def execute_decision(decision: Decision, session_id: int, margin_mode: str
     logger.info(f"🔧 执行决策: {decision.symbol} {decision.action}")
     
     try:
-        db = next(get_db())
-        try:
-            trade_repo = TradeRepository(db)
-            
-            # 创建交易器（自动从配置读取交易所类型）
-            trader = get_trader()
+        # 创建交易器（自动从配置读取交易所类型）
+        trader = get_trader()
+        
+        # 根据不同的 action 执行不同的操作
+        if decision.action in TradingAction.OPEN_ACTIONS:
+            return await _open_position(decision, trader, margin_mode, prices)
             
-            # 根据不同的 action 执行不同的操作
-            if decision.action == TradingAction.OPEN_LONG:
-                # 获取当前价格用于计算数量
-                exchange = get_exchange()
-                # 使用 asyncio.to_thread 避免阻塞事件循环
-                ticker = await asyncio.to_thread(exchange.get_ticker, decision.symbol)
-                current_price = ticker.get('last') or 0
-                
-                # 计算购买数量
-                quantity = decision.position_size_usd / current_price if current_price > 0 else 0
-                
-                if quantity <= 0:
-                    return {"success": False, "error": "数量无效"}
-                
-                # 计算止损止盈价格（优先使用绝对价格，其次使用百分比）
-                stop_loss_price = None
-                take_profit_price = None
-
-                if decision.stop_loss_price is not None:
-                    # 使用绝对价格
-                    stop_loss_price = decision.stop_loss_price
-                elif decision.stop_loss_pct is not None:
-                    # 使用百分比计算
-                    stop_loss_price = current_price * (1 - decision.stop_loss_pct / 100)
-
-                if decision.take_profit_price is not None:
-                    # 使用绝对价格
-                    take_profit_price = decision.take_profit_price
-                elif decision.take_profit_pct is not None:
-                    # 使用百分比计算
-                    take_profit_price = current_price * (1 + decision.take_profit_pct / 100)
-                
-                # 执行开多仓交易
-                logger.info(f"📈 开多仓: {decision.symbol} 数量={quantity:.6f}, 保证金模式={margin_mode}")
-                # 使用 asyncio.to_thread 避免阻塞事件循环
-                order_result = await asyncio.to_thread(
-                    trader.open_long,
-                    symbol=decision.symbol,
-                    quantity=quantity,
-                    leverage=decision.leverage,
-                    stop_loss_price=stop_loss_price,
-                    take_profit_price=take_profit_price,
-                    margin_mode=margin_mode
-                )
-                
-                if not order_result.success:
-                    logger.error(f"❌ 开多仓失败: {order_result.error}")
-                    return {"success": False, "error": order_result.error}
-
-                # 不创建交易记录，持仓信息从交易所API获取
-                # 只有平仓时才创建完整的交易记录
-
-                logger.info(f"✅ 开多仓成功: {decision.symbol}, 订单ID={order_result.order_id}")
-                return {
-                    "success": True,
-                    "action": "open_long",
-                    "order_id": order_result.order_id,
-                    "entry_price": float(order_result.avg_price or current_price),
-                    "quantity": float(order_result.filled_quantity or quantity)
-                }
-                
-            elif decision.action == TradingAction.OPEN_SHORT:
-                # 获取当前价格用于计算数量
-                exchange = get_exchange()
-                # 使用 asyncio.to_thread 避免阻塞事件循环
-                ticker = await asyncio.to_thread(exchange.get_ticker, decision.symbol)
-                current_price = ticker.get('last') or 0
-                
-                # 计算卖空数量
-                quantity = decision.position_size_usd / current_price if current_price > 0 else 0
-                
-                if quantity <= 0:
-                    return {"success": False, "error": "数量无效"}
-                
-                # 计算止损止盈价格（优先使用绝对价格，其次使用百分比）
-                stop_loss_price = None
-                take_profit_price = None
-
-                if decision.stop_loss_price is not None:
-                    # 使用绝对价格（做空时止损在上方）
-                    stop_loss_price = decision.stop_loss_price
-                elif decision.stop_loss_pct is not None:
-                    # 使用百分比计算（做空时止损在上方）
-                    stop_loss_price = current_price * (1 + decision.stop_loss_pct / 100)
-
-                if decision.take_profit_price is not None:
-                    # 使用绝对价格（做空时止盈在下方）
-                    take_profit_price = decision.take_profit_price
-                elif decision.take_profit_pct is not None:
-                    # 使用百分比计算（做空时止盈在下方）
-                    take_profit_price = current_price * (1 - decision.take_profit_pct / 100)
-                
-                # 执行开空仓交易
-                logger.info(f"📉 开空仓: {decision.symbol} 数量={quantity:.6f}, 保证金模式={margin_mode}")
-                # 使用 asyncio.to_thread 避免阻塞事件循环
-                order_result = await asyncio.to_thread(
-                    trader.open_short,
-                    symbol=decision.symbol,
-                    quantity=quantity,
-                    leverage=decision.leverage,
-                    stop_loss_price=stop_loss_price,
-                    take_profit_price=take_profit_price,
-                    margin_mode=margin_mode
-                )
-                
-                if not order_result.success:
-                    logger.error(f"❌ 开空仓失败: {order_result.error}")
-                    return {"success": False, "error": order_result.error}
-
-                # 不创建交易记录，持仓信息从交易所API获取
-                # 只有平仓时才创建完整的交易记录
-
-                logger.info(f"✅ 开空仓成功: {decision.symbol}, 订单ID={order_result.order_id}")
-                return {
-                    "success": True,
-                    "action": "open_short",
-                    "order_id": order_result.order_id,
-                    "entry_price": float(order_result.avg_price or current_price),
-                    "quantity": float(order_result.filled_quantity or quantity)
-                }
-                
-            elif decision.action in TradingAction.CLOSE_ACTIONS:
-                # 平仓：从交易所API查找对应的持仓
-                side = PositionSide.LONG if decision.action == TradingAction.CLOSE_LONG else PositionSide.SHORT
+        elif decision.action in TradingAction.CLOSE_ACTIONS:
+            # 平仓：从交易所API查找对应的持仓
+            side = PositionSide.LONG if decision.action == TradingAction.CLOSE_LONG else PositionSide.SHORT
 
-                # 从交易所获取实时持仓
+            # 优先使用本周期预先获取的持仓，没有时从交易所获取实时持仓
+            if positions is None:
                 exchange = get_exchange()
-                positions = await asyncio.to_thread(exchange.get_positions)
-
-                target_position = None
-                for pos in positions:
-                    # ccxt返回的持仓格式: {'symbol': 'BTC/USDT:USDT', 'side': 'long', 'contracts': 0.001, ...}
-                    if pos.get('symbol') == decision.symbol and pos.get('side') == side:
-                        target_position = pos
-                        break
-
-                if not target_position or float(target_position.get('contracts', 0)) == 0:
-                    logger.warning(f"⚠️ 未找到要平仓的持仓: {decision.symbol} {side}")
-                    return {"success": False, "error": "持仓不存在"}
-
-                quantity = float(target_position.get('contracts', 0))
-
-                # 执行平仓交易
-                position_side = TraderPositionSide.LONG if side == "long" else TraderPositionSide.SHORT
-                logger.info(f"🔻 平仓: {decision.symbol} {side} 数量={quantity}")
-                # 使用 asyncio.to_thread 避免阻塞事件循环
-                order_result = await asyncio.to_thread(
-                    trader.close_position,
-                    symbol=decision.symbol,
-                    position_side=position_side,
-                    quantity=quantity
-                )
+                positions = await run_exchange_call(exchange.get_positions)
 
-                if not order_result.success:
-                    logger.error(f"❌ 平仓失败: {order_result.error}")
-                    return {"success": False, "error": order_result.error}
-
-                # 创建完整的交易记录
-                exit_price = Decimal(str(order_result.avg_price)) if order_result.avg_price else Decimal(str(target_position.get('markPrice', 0)))
-                filled_quantity = Decimal(str(order_result.filled_quantity or quantity))
-                leverage_value = int(target_position.get('leverage', 1))
-
-                # 从持仓信息获取开仓价格和时间
-                entry_price = Decimal(str(target_position.get('entryPrice', 0)))
+            target_position = None
+            for pos in positions:
+                # 持仓格式: {'symbol': 'BTCUSDT', 'side': 'long', 'quantity': 0.001, ...}
+                if pos.get('symbol') == decision.symbol and pos.get('side') == side:
+                    target_position = pos
+                    break
 
-                # 获取开仓时间（从持仓的 updateTime 或当前时间推算）
-                # 注意：币安API的 updateTime 是最后更新时间，不一定是开仓时间
-                # 这里简化处理，实际应该从订单历史获取
-                from datetime import datetime, timezone, timedelta
-                exit_time = datetime.now(timezone.utc)
+            quantity = float(target_position.get('quantity', 0)) if target_position else 0
+            if quantity == 0:
+                logger.warning(f"⚠️ 未找到要平仓的持仓: {decision.symbol} {side}")
+                return {"success": False, "error": "持仓不存在"}
+
+            # 执行平仓交易
+            position_side = TraderPositionSide.LONG if side == "long" else TraderPositionSide.SHORT
+            logger.info(f"🔻 平仓: {decision.symbol} {side} 数量={quantity}")
+            # 在交易所线程池中执行，避免阻塞事件循环
+            order_result = await run_exchange_call(
+                trader.close_position,
+                symbol=decision.symbol,
+                position_side=position_side,
+                quantity=quantity
+            )
 
-                # 假设持仓时间（实际应该从交易所获取准确时间）
-                # 这里用一个简化的估算：从 position 的 info 中获取
-                entry_time = exit_time - timedelta(minutes=5)  # 临时方案
+            if not order_result.success:
+                logger.error(f"❌ 平仓失败: {order_result.error}")
+                return {"success": False, "error": order_result.error}
+
+            # 创建完整的交易记录
+            exit_price = Decimal(str(order_result.avg_price)) if order_result.avg_price else Decimal(str(target_position.get('markPrice', 0)))
+            filled_quantity = Decimal(str(order_result.filled_quantity or quantity))
+            leverage_value = int(target_position.get('leverage', 1))
+
+            # 从持仓信息获取开仓价格和时间
+            entry_price = Decimal(str(target_position.get('entryPrice', 0)))
+
+            # 开仓时间、开仓订单和手续费取自本进程的开仓记录
+            exit_time = datetime.now(timezone.utc)
+            record = _open_position_records.pop((decision.symbol, side), None)
+            if record is not None:
+                entry_time = record.entry_time
+                entry_order_id = record.entry_order_id
+                entry_fee = record.entry_fee
+            else:
+                # 没有记录（如进程重启前开的仓）：币安持仓接口不返回开仓时间，只能估算
+                entry_time = exit_time - timedelta(minutes=5)
+                entry_order_id = None
+                entry_fee = Decimal(0)
 
-                # 创建完整的交易记录
-                trade = trade_repo.create_closed_trade(
-                    session_id=session_id,
-                    symbol=decision.symbol,
-                    side=side,  # 'long' or 'short'
-                    quantity=filled_quantity,
-                    entry_price=entry_price,
-                    exit_price=exit_price,
-                    entry_time=entry_time,
-                    exit_time=exit_time,
-                    leverage=leverage_value,
-                    entry_fee=Decimal(0),  # 开仓手续费需要从历史订单获取
-                    exit_fee=Decimal(str(order_result.fee)) if order_result.fee else Decimal(0),
-                    fee_currency=order_result.fee_currency or 'USDT',
-                    ai_decision_id=None,
-                    entry_order_id=None,  # 需要从交易所获取
-                    exit_order_id=order_result.order_id
-                )
+            # 创建完整的交易记录
+            trade_fields = dict(
+                session_id=session_id,
+                symbol=decision.symbol,
+                side=side,  # 'long' or 'short'
+                quantity=filled_quantity,
+                entry_price=entry_price,
+                exit_price=exit_price,
+                entry_time=entry_time,
+                exit_time=exit_time,
+                leverage=leverage_value,
+                entry_fee=entry_fee,
+                exit_fee=Decimal(str(order_result.fee)) if order_result.fee else Decimal(0),
+                fee_currency=order_result.fee_currency or 'USDT',
+                ai_decision_id=None,
+                entry_order_id=entry_order_id,
+                exit_order_id=order_result.order_id
+            )
+            # 在线程中打开独立会话写入，连接池检出和提交不阻塞事件循环中并发执行的其他决策
+            trade = await asyncio.to_thread(_persist_closed_trade, trade_fields)
 
-                logger.info(f"✅ 平仓成功: {decision.symbol} {side}, 交易ID={trade.id}, P&L=${float(trade.pnl):.2f}")
-                return {
-                    "success": True,
-                    "action": decision.action,
-                    "trade_id": trade.id,
-                    "order_id": order_result.order_id,
-                    "exit_price": float(exit_price),
-                    "quantity": float(filled_quantity),
-                    "pnl": float(trade.pnl)
-                }
-                
-            elif decision.action == TradingAction.HOLD:
-                # 保持持仓不变
-                logger.info(f"⏸️ 保持持仓: {decision.symbol}")
-                return {"success": True, "action": TradingAction.HOLD}
-                
-            elif decision.action == TradingAction.WAIT:
-                # 观望，不做任何操作
-                logger.info(f"👀 观望: {decision.symbol}")
-                return {"success": True, "action": TradingAction.WAIT}
-                
-            else:
-                logger.warning(f"⚠️ 未知的操作类型: {decision.action}")
-                return {"success": False, "error": f"未知操作: {decision.action}"}
-                
-        finally:
-            db.close()
+            logger.info(f"✅ 平仓成功: {decision.symbol} {side}, 交易ID={trade.id}, P&L=${float(trade.pnl):.2f}")
+            return {
+                "success": True,
+                "action": decision.action,
+                "trade_id": trade.id,
+                "order_id": order_result.order_id,
+                "exit_price": float(exit_price),
+                "quantity": float(filled_quantity),
+                "pnl": float(trade.pnl)
+            }
+            
+        elif decision.action == TradingAction.HOLD:
+            # 保持持仓不变
+            logger.info(f"⏸️ 保持持仓: {decision.symbol}")
+            return {"success": True, "action": TradingAction.HOLD}
+            
+        elif decision.action == TradingAction.WAIT:
+            # 观望，不做任何操作
+            logger.info(f"👀 观望: {decision.symbol}")
+            return {"success": True, "action": TradingAction.WAIT}
             
+        else:
+            logger.warning(f"⚠️ 未知的操作类型: {decision.action}")
+            return {"success": False, "error": f"未知操作: {decision.action}"}
+        
     except Exception as e:
         logger.exception(f"❌ 执行决策失败: {e}")
         return {"success": False, "error": str(e)}
@@ -529,10 +499,36 @@ class TradingAgentService:
     """
     
     def __init__(self, session_id: int):
+        # 延迟导入，避免与 agents 模块循环依赖
+        from ..agents import get_trading_graph
+
         self.session_id = session_id
         self.call_count = 0
         self.is_running = False
         self.start_time = datetime.now()
+        # 编译后的工作流图是全局共享单例，每个 Agent 只需获取一次
+        self._graph = get_trading_graph()
+        # 工作流使用的风险参数缓存: (symbols, risk_params, 合并后的参数)
+        self._risk_params_cache: Optional[tuple] = None
+
+    def _get_state_risk_params(
+        self,
+        symbols: List[str],
+        risk_params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        获取注入 symbols 后的风险参数
+
+        后台循环每个周期传入的是同一组对象，只在首次或入参变化时重新合并
+        """
+        cached = self._risk_params_cache
+        if cached is not None and cached[0] is symbols and cached[1] is risk_params:
+            return cached[2]
+
+        merged = risk_params.copy()
+        merged['symbols'] = symbols  # 添加到 risk_params 供提示词使用
+        self._risk_params_cache = (symbols, risk_params, merged)
+        return merged
     
     async def run_decision_cycle(
         self,
@@ -550,20 +546,19 @@ class TradingAgentService:
             决策结果
         """
         self.call_count += 1
+        # 周期开始时间只取一次，工作流记录和决策上下文共用
+        cycle_started_at = datetime.now()
         
-        logger.info("=" * 80)
-        logger.info(f"⏰ 决策周期 #{self.call_count} 开始 (LangGraph)")
-        logger.info(f"📌 Session ID: {self.session_id}")
-        logger.info(f"📌 交易对: {symbols}")
-        logger.info("=" * 80)
-        
+        logger.info(
+            "⏰ 决策周期开始 (LangGraph)",
+            session_id=self.session_id,
+            call_count=self.call_count,
+            symbols=symbols
+        )
+
         try:
-            # 导入LangGraph工作流
-            from ..agents import get_trading_graph
-            
             # 1. 构建初始状态
-            risk_params_copy = risk_params.copy()
-            risk_params_copy['symbols'] = symbols  # 添加到 risk_params 供提示词使用
+            risk_params_copy = self._get_state_risk_params(symbols, risk_params)
             
             initial_state = {
                 "session_id": self.session_id,
@@ -573,16 +568,15 @@ class TradingAgentService:
                 "start_time": self.start_time,
                 "errors": [],
                 "debug_info": {
-                    "workflow_started_at": datetime.now().isoformat()
+                    "workflow_started_at": cycle_started_at.isoformat()
                 }
             }
             
             # 2. 获取并执行LangGraph工作流
-            logger.info("🚀 执行LangGraph工作流...")
-            trading_graph = get_trading_graph()
-            final_state = await trading_graph.ainvoke(initial_state)
+            logger.debug("🚀 执行LangGraph工作流...")
+            final_state = await self._graph.ainvoke(initial_state)
             
-            logger.info("✅ LangGraph工作流执行完成")
+            logger.debug("✅ LangGraph工作流执行完成")
             
             # 3. 从最终状态提取结果
             ai_response = final_state.get("ai_response", "")
@@ -611,7 +605,7 @@ class TradingAgentService:
             # 5. 保存决策记录到数据库
             # 构建兼容的context对象
             context = TradingContext()
-            context.current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            context.current_time = cycle_started_at.strftime("%Y-%m-%d %H:%M:%S")
             context.call_count = self.call_count
             context.session_id = self.session_id
             context.symbols = symbols
@@ -625,9 +619,7 @@ class TradingAgentService:
                 user_prompt=user_prompt
             )
             
-            logger.info("✅" * 30)
-            logger.info(f"✅ 决策周期 #{self.call_count} 完成")
-            logger.info("✅" * 30)
+            logger.info("✅ 决策周期完成", session_id=self.session_id, call_count=self.call_count)
             
             return {
                 "success": True,
@@ -656,27 +648,48 @@ class TradingAgentService:
         context: TradingContext,
         user_prompt: str = ""
     ) -> None:
-        """保存决策到数据库"""
+        """保存决策到数据库（同步数据库/账户查询放到线程中执行，不阻塞事件循环）"""
+        await asyncio.to_thread(
+            self._save_decision_sync,
+            ai_response,
+            decisions,
+            execution_results,
+            context,
+            user_prompt
+        )
+
+    def _save_decision_sync(
+        self,
+        ai_response: str,
+        decisions: List[Decision],
+        execution_results: List[Dict],
+        context: TradingContext,
+        user_prompt: str = ""
+    ) -> None:
+        """保存决策到数据库（同步实现）"""
         try:
-            db = next(get_db())
-            try:
+            with get_session() as db:
                 decision_repo = AIDecisionRepository(db)
 
-                # 提取所有涉及的交易对
-                symbols = list(set([d.symbol for d in decisions]))
-
-                # 判断决策类型（简化处理）
+                # 一次遍历：提取交易对（去重并保持决策顺序）、判断决策类型、累加信心度
+                symbols: Dict[str, None] = {}
                 decision_type = "hold"
+                confidence_sum = 0
                 for d in decisions:
-                    if d.action == TradingAction.OPEN_LONG:
-                        decision_type = "buy"
-                        break
-                    elif d.action == TradingAction.OPEN_SHORT:
-                        decision_type = "sell"
-                        break
-
-                # 计算平均信心度
-                avg_confidence = sum([d.confidence for d in decisions]) / len(decisions) if decisions else 50
+                    symbols[d.symbol] = None
+                    confidence_sum += d.confidence
+                    # 决策类型取第一个开仓决策（简化处理）
+                    if decision_type == "hold":
+                        if d.action == TradingAction.OPEN_LONG:
+                            decision_type = "buy"
+                        elif d.action == TradingAction.OPEN_SHORT:
+                            decision_type = "sell"
+
+                # 平均信心度（0-1），直接用 Decimal 计算，不经过字符串转换
+                if decisions:
+                    confidence = Decimal(confidence_sum) / (100 * len(decisions))
+                else:
+                    confidence = Decimal(50) / 100
 
                 # 获取账户信息和浮动盈亏
                 account_balance = None
@@ -704,9 +717,9 @@ class TradingAgentService:
                 # 保存决策（prompt_data存储完整的用户输入prompt）
                 decision_repo.save_decision(
                     session_id=self.session_id,
-                    symbols=symbols,
+                    symbols=list(symbols),
                     decision_type=decision_type,
-                    confidence=Decimal(str(avg_confidence / 100)),
+                    confidence=confidence,
                     prompt_data={
                         "user_prompt": user_prompt,  # 完整的用户prompt
                         "context": context.to_dict()  # 上下文信息
@@ -725,9 +738,6 @@ class TradingAgentService:
 
                 logger.info("💾 决策已保存到数据库")
 
-            finally:
-                db.close()
-
         except Exception as e:
             logger.exception(f"❌ 保存决策失败: {e}")
 
@@ -740,14 +750,55 @@ class BackgroundAgentManager:
     
     管理会话的后台交易任务
     状态存储在数据库中，内存只保留 Task 引用
+
+    每个会话是同一事件循环上的一个 asyncio.Task，而不是独立线程：
+    等待中的会话只是事件循环定时器堆里的一项，由单个循环统一唤醒，
+    因此 N 个会话不会占用 N 个阻塞线程
     """
     
     def __init__(self):
         # 只存储 Task 引用和取消事件
         self._tasks: Dict[int, asyncio.Task] = {}
         self._cancel_events: Dict[int, asyncio.Event] = {}
+        # 全局锁只保护 _tasks/_cancel_events 的增删
         self._lock = asyncio.Lock()
+        # 每个会话一把锁，串行化同一会话的启停和状态写入，不同会话互不阻塞
+        # 锁只在有协程使用（持有或等待）期间保留，使用计数归零时移除，字典不会随会话数增长
+        self._session_locks: Dict[int, asyncio.Lock] = {}
+        self._session_lock_users: Dict[int, int] = {}
+        # 状态快照: session_id -> AgentSnapshot，状态写入时失效，读取时无锁
+        self._snapshots: Dict[int, AgentSnapshot] = {}
+        # 快照代数: 每次失效 +1，防止并发读取把失效前读到的旧数据重新发布
+        self._snapshot_gen: Dict[int, int] = {}
         logger.info("✨ 后台交易管理器已初始化")
+
+    def _invalidate_snapshot(self, session_id: int) -> None:
+        """状态写入后使快照失效"""
+        self._snapshots.pop(session_id, None)
+        self._snapshot_gen[session_id] = self._snapshot_gen.get(session_id, 0) + 1
+
+    @asynccontextmanager
+    async def _session_lock(self, session_id: int):
+        """
+        持有会话级锁（不存在则创建）
+
+        计数包含等待中的协程：计数未归零时锁一直保留，后来者拿到的总是同一把锁；
+        归零时已无人持有或等待，移除后再次使用会新建，不会出现两把锁同时生效
+        """
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        self._session_lock_users[session_id] = self._session_lock_users.get(session_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            users = self._session_lock_users[session_id] - 1
+            if users:
+                self._session_lock_users[session_id] = users
+            else:
+                del self._session_lock_users[session_id]
+                del self._session_locks[session_id]
     
     async def start_background_agent(
         self,
@@ -765,17 +816,12 @@ class BackgroundAgentManager:
             risk_params: 风险参数
             decision_interval: 决策间隔（秒），默认180秒（3分钟）
         """
-        async with self._lock:
+        async with self._session_lock(session_id):
             if session_id in self._tasks:
                 raise ValueError(f"Session {session_id} 的 Agent 已在运行")
             
             if risk_params is None:
-                risk_params = {
-                    "max_position_size": 0.2,
-                    "stop_loss_pct": 0.05,
-                    "take_profit_pct": 0.10,
-                    "max_leverage": 3
-                }
+                risk_params = dict(DEFAULT_RISK_PARAMS)
             
             # 更新数据库：设置后台状态为 starting
             await self._update_session_status(
@@ -800,8 +846,9 @@ class BackgroundAgentManager:
                 name=f"BackgroundAgent-{session_id}"
             )
             
-            self._tasks[session_id] = task
-            self._cancel_events[session_id] = cancel_event
+            async with self._lock:
+                self._tasks[session_id] = task
+                self._cancel_events[session_id] = cancel_event
             
             logger.info(f"✅ 后台交易已启动", session_id=session_id, interval=decision_interval)
             
@@ -820,7 +867,7 @@ class BackgroundAgentManager:
         """
         logger.info(f"🛑 [stop] 开始停止 Session {session_id}...")
         
-        async with self._lock:
+        async with self._session_lock(session_id):
             if session_id not in self._tasks:
                 logger.error(f"❌ [stop] Session {session_id} 后台交易未运行")
                 raise ValueError(f"Session {session_id} 后台交易未运行")
@@ -873,7 +920,14 @@ class BackgroundAgentManager:
         }
     
     async def get_agent_status(self, session_id: int) -> Optional[Dict[str, Any]]:
-        """获取后台交易状态 - 从数据库读取"""
+        """获取后台交易状态 - 优先读取内存快照，未命中时从数据库读取"""
+        # 会话状态只由本管理器写入，写入时会使快照失效，因此命中的快照一定是最新的
+        snapshot = self._snapshots.get(session_id)
+        if snapshot is not None:
+            return snapshot.to_dict()
+
+        gen = self._snapshot_gen.get(session_id, 0)
+
         # 从数据库获取会话信息
         session_data = await self._get_session_status(session_id)
         
@@ -897,35 +951,39 @@ class BackgroundAgentManager:
         elif not trading_params:
             trading_params = {}
 
-        return {
-            'session_id': session_id,
-            'status': session_data.get('background_status', 'idle'),
-            'started_at': session_data.get('background_started_at').isoformat() if session_data.get('background_started_at') else None,
-            'stopped_at': session_data.get('background_stopped_at').isoformat() if session_data.get('background_stopped_at') else None,
-            'last_run_time': session_data.get('last_decision_time').isoformat() if session_data.get('last_decision_time') else None,
-            'run_count': session_data.get('decision_count', 0),
-            'config': {
-                'symbols': trading_symbols,
-                'decision_interval': session_data.get('decision_interval', 180),
-                'risk_params': trading_params
-            },
-            'last_error': session_data.get('last_error')
-        }
+        snapshot = AgentSnapshot(
+            session_id=session_id,
+            status=session_data.get('background_status', 'idle'),
+            started_at=session_data.get('background_started_at').isoformat() if session_data.get('background_started_at') else None,
+            stopped_at=session_data.get('background_stopped_at').isoformat() if session_data.get('background_stopped_at') else None,
+            last_run_time=session_data.get('last_decision_time').isoformat() if session_data.get('last_decision_time') else None,
+            run_count=session_data.get('decision_count', 0),
+            symbols=tuple(trading_symbols),
+            decision_interval=session_data.get('decision_interval', 180),
+            risk_params=trading_params,
+            last_error=session_data.get('last_error')
+        )
+        # 读取期间没有新的写入时才发布（单次字典赋值）
+        if self._snapshot_gen.get(session_id, 0) == gen:
+            self._snapshots[session_id] = snapshot
+        return snapshot.to_dict()
     
     def list_agents(self) -> List[Dict[str, Any]]:
         """
         列出所有运行中的 Agent (同步版本，用于非async上下文)
         
         注意：这个方法是同步的，仅用于 shutdown 时调用
+        不获取任何锁（asyncio.Lock 也无法在同步代码中获取），只读取 _tasks 的快照，
+        因此不会与启停操作互相等待
         """
         logger.info(f"📋 [list_agents] 开始（同步版本）...")
-        result = []
-        for session_id in list(self._tasks.keys()):
-            task = self._tasks.get(session_id)
-            if task and not task.done():
-                result.append({
-                    'session_id': session_id
-                })
+        # 一次性拍下快照，避免逐个 session_id 回查字典
+        snapshot = tuple(self._tasks.items())
+        result = [
+            {'session_id': session_id}
+            for session_id, task in snapshot
+            if not task.done()
+        ]
         logger.info(f"📋 [list_agents] 返回 {len(result)} 个 Agent")
         return result
     
@@ -940,16 +998,17 @@ class BackgroundAgentManager:
         """
         后台循环 - 定时执行交易决策
         
-        使用 asyncio.sleep 等待固定间隔，每个周期调用一次决策
-        使用 asyncio.Event 进行优雅取消
+        按单调时钟截止时间等待到下一个周期，每个周期调用一次决策
+        等待挂在 asyncio.Event 上，收到取消信号立即返回
         状态存储在数据库中
         """
-        logger.info("🔄" * 30)
-        logger.info("🔄 后台循环启动")
-        logger.info(f"📌 Session ID: {session_id}")
-        logger.info(f"📌 决策间隔: {decision_interval}秒")
-        logger.info("🔄" * 30)
-        
+        logger.info("🔄 后台循环启动", session_id=session_id, interval=decision_interval)
+
+        # 冻结本会话的交易对和风险参数：调用方之后修改原对象不会影响运行中的循环，
+        # 每个周期传入的始终是同一组不可变对象，决策服务可以安全地按对象身份复用合并结果
+        symbols = tuple(symbols)
+        risk_params = MappingProxyType(dict(risk_params))
+
         # 更新数据库状态为 running
         await self._update_session_status(
             session_id=session_id,
@@ -959,11 +1018,20 @@ class BackgroundAgentManager:
         # 创建 Agent 实例
         agent = TradingAgentService(session_id)
         
+        # 基于单调时钟的滚动截止时间，保证按固定节奏触发、不累积漂移
+        next_tick = time.monotonic() + decision_interval
+        # 循环退出时写入的最终状态
+        final_status: Dict[str, Any] = {'background_status': 'stopped'}
+
         try:
             # 首次立即执行
             logger.info("🚀 执行首次决策周期...")
+            # 连续失败次数，用于指数退避
+            consecutive_errors = 0
             try:
                 result = await agent.run_decision_cycle(symbols, risk_params)
+                if not result.get('success'):
+                    consecutive_errors += 1
                 
                 # 更新数据库
                 await self._increment_decision_count(session_id)
@@ -971,6 +1039,7 @@ class BackgroundAgentManager:
                 logger.info(f"✅ 首次决策完成, 成功={result.get('success')}")
                 
             except Exception as e:
+                consecutive_errors += 1
                 logger.exception(f"❌ 首次决策失败: {e}")
                 
                 # 记录错误到数据库
@@ -979,52 +1048,55 @@ class BackgroundAgentManager:
                     last_error=str(e)
                 )
             
-            # 定时循环
+            # 定时循环（热路径上的属性查找提前绑定为局部变量）
+            monotonic = time.monotonic
+            run_cycle = agent.run_decision_cycle
+            increment_count = self._increment_decision_count
+            wait_cancelled = self._wait_cancelled
+            last_session_check = monotonic()
             loop_count = 1
             while not cancel_event.is_set():
                 # 等待下一个周期（可被取消信号中断）
-                logger.info(f"😴 等待 {decision_interval}秒后进行下一次决策...")
-                logger.info(f"🚩 [循环] 取消信号状态: {cancel_event.is_set()}")
-                
-                try:
-                    # 使用 asyncio.wait_for 实现可中断的等待
-                    await asyncio.wait_for(
-                        cancel_event.wait(),
-                        timeout=decision_interval
-                    )
-                    # 如果 wait() 返回了，说明收到取消信号
+                now = monotonic()
+                if next_tick <= now:
+                    # 上一周期超时，从当前时刻重新对齐，避免连续补跑
+                    next_tick = now
+                if consecutive_errors:
+                    # 连续失败时在本周期截止时间上额外顺延（LLM/交易所故障期间避免频繁重试），
+                    # 之后的周期从顺延后的时刻起算
+                    backoff = min(60, 2 ** consecutive_errors)
+                    logger.warning(f"⏳ 连续失败 {consecutive_errors} 次，额外退避 {backoff} 秒")
+                    next_tick += backoff
+                sleep_time = next_tick - now
+                next_tick += decision_interval
+                logger.debug(f"😴 等待 {sleep_time:.1f}秒后进行下一次决策...")
+
+                if await wait_cancelled(cancel_event, sleep_time):
                     logger.info(f"🛑 [循环] 收到取消信号，退出循环")
                     break
-                except asyncio.TimeoutError:
-                    # 超时是正常的，继续下一次循环
-                    logger.info(f"⏰ [循环] 等待超时，开始新周期")
-                
-                # 再次检查取消信号
-                if cancel_event.is_set():
-                    logger.info(f"🛑 [循环] 检测到取消信号，退出循环")
-                    break
-                
+
                 loop_count += 1
-                loop_start = time.time()
-                
-                logger.info("🔄" * 30)
-                logger.info(f"🔄 决策周期 #{loop_count} 开始")
-                logger.info(f"⏰ 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                
+                # 耗时统计使用单调时钟，不受系统时间调整影响
+                loop_start = monotonic()
+                success = False
+
                 try:
-                    result = await agent.run_decision_cycle(symbols, risk_params)
-                    
+                    # 下单前检查会话状态（按间隔节流，避免决策间隔很短时每个周期都查库）
+                    if monotonic() - last_session_check >= SESSION_CHECK_INTERVAL:
+                        last_session_check = monotonic()
+                        if not await self._check_session_running(session_id):
+                            logger.warning("⚠️ 会话已结束，停止循环")
+                            break
+
+                    result = await run_cycle(symbols, risk_params)
+                    success = result.get('success')
+                    consecutive_errors = 0 if success else consecutive_errors + 1
+
                     # 更新数据库
-                    await self._increment_decision_count(session_id)
-                    
-                    logger.info(f"✅ 决策周期 #{loop_count} 完成, 成功={result.get('success')}")
-                    
-                    # 检查会话状态
-                    if not await self._check_session_running(session_id):
-                        logger.warning("⚠️ 会话已结束，停止循环")
-                        break
+                    await increment_count(session_id)
                     
                 except Exception as e:
+                    consecutive_errors += 1
                     logger.exception(f"❌ 决策周期 #{loop_count} 失败: {e}")
                     
                     # 记录错误到数据库
@@ -1033,14 +1105,17 @@ class BackgroundAgentManager:
                         last_error=str(e)
                     )
                 
-                loop_duration = time.time() - loop_start
-                logger.info(f"⏱️ 本次周期耗时: {loop_duration:.2f}秒")
-                logger.info("🔄" * 30)
-            
-            logger.info("🛑" * 30)
-            logger.info("🛑 后台循环正常结束")
-            logger.info(f"📊 总循环次数: {loop_count}")
-            logger.info("🛑" * 30)
+                loop_duration = monotonic() - loop_start
+                logger.info(
+                    "🔄 决策周期结束",
+                    session_id=session_id,
+                    loop=loop_count,
+                    duration_ms=int(loop_duration * 1000),
+                    next_sleep_s=round(max(0, next_tick - monotonic()), 1),
+                    success=success
+                )
+
+            logger.info("🛑 后台循环正常结束", session_id=session_id, loop_count=loop_count)
             
         except asyncio.CancelledError:
             logger.info(f"🛑 Task 被取消 (Session {session_id})")
@@ -1049,55 +1124,54 @@ class BackgroundAgentManager:
         except Exception as e:
             logger.exception(f"💥 后台循环异常终止: {e}")
             
-            # 更新数据库：后台崩溃
-            await self._update_session_status(
-                session_id=session_id,
-                background_status='crashed',
-                last_error=str(e),
-                background_stopped_at=datetime.now(timezone.utc)
-            )
+            # 后台崩溃状态由 finally 块统一写入
+            final_status = {'background_status': 'crashed', 'last_error': str(e)}
             
             # Agent 崩溃时，自动将会话状态改为 crashed
+            def update_session():
+                from .trading_session_service import TradingSessionService
+                with get_session() as db:
+                    session_service = TradingSessionService(db)
+                    session_service.end_session(
+                        session_id=session_id,
+                        status='crashed',
+                        notes=f'Agent 异常终止: {str(e)}'
+                    )
+            
             try:
-                db = next(get_db())
-                try:
-                    def update_session():
-                        from .trading_session_service import TradingSessionService
-                        session_service = TradingSessionService(db)
-                        session_service.end_session(
-                            session_id=session_id,
-                            status='crashed',
-                            notes=f'Agent 异常终止: {str(e)}'
-                        )
-                    
-                    await asyncio.to_thread(update_session)
-                    logger.info(f"✅ 已将会话 {session_id} 状态改为 crashed")
-                except Exception as update_error:
-                    logger.error(f"更新会话状态失败: {str(update_error)}")
-                    try:
-                        db.rollback()
-                    except Exception:
-                        pass
-                finally:
-                    try:
-                        db.close()
-                    except Exception as close_error:
-                        logger.debug(f"关闭数据库会话时出错: {close_error}")
-            except Exception as db_error:
-                logger.error(f"数据库操作失败: {str(db_error)}")
+                await asyncio.to_thread(update_session)
+                logger.info(f"✅ 已将会话 {session_id} 状态改为 crashed")
+            except Exception as update_error:
+                logger.error(f"更新会话状态失败: {str(update_error)}")
         
         finally:
             logger.info(f"🔚 [loop] finally 块 - Session {session_id}")
             
-            # 更新数据库：后台停止
+            # 更新数据库：后台停止（崩溃时为 crashed），一条 UPDATE 写入最终状态
             await self._update_session_status(
                 session_id=session_id,
-                background_status='stopped',
-                background_stopped_at=datetime.now(timezone.utc)
+                background_stopped_at=datetime.now(timezone.utc),
+                **final_status
             )
             
             logger.info(f"🎬 [loop] Task 即将退出 - Session {session_id}")
     
+    @staticmethod
+    async def _wait_cancelled(cancel_event: asyncio.Event, timeout: float) -> bool:
+        """
+        可中断的等待
+
+        Returns:
+            True 表示等待期间收到取消信号，False 表示正常超时
+        """
+        # asyncio.timeout 直接在当前任务上设置超时，不像 wait_for 那样额外包装一层任务
+        try:
+            async with asyncio.timeout(timeout):
+                await cancel_event.wait()
+            return True
+        except TimeoutError:
+            return False
+
     async def _update_session_status(self, session_id: int, **kwargs):
         """
         更新会话状态字段
@@ -1106,32 +1180,31 @@ class BackgroundAgentManager:
             session_id: 会话 ID
             **kwargs: 要更新的字段（background_status, decision_count 等）
         """
-        db = next(get_db())
         try:
+            # 先在工作线程外组装好全部字段，再一次性写入
+            values = {}
+            for key, value in kwargs.items():
+                if hasattr(TradingSession, key):
+                    # 序列化 JSON 字段（SQLite 兼容）
+                    if key in ('trading_symbols', 'trading_params') and value is not None:
+                        value = json.dumps(value) if not isinstance(value, str) else value
+                    values[key] = value
+            if not values:
+                return
+
             def update():
-                from ..models.trading_session import TradingSession
-                session = db.query(TradingSession).filter_by(id=session_id).first()
-                if session:
-                    for key, value in kwargs.items():
-                        if hasattr(session, key):
-                            # 序列化 JSON 字段（SQLite 兼容）
-                            if key in ['trading_symbols', 'trading_params'] and value is not None:
-                                value = json.dumps(value) if not isinstance(value, str) else value
-                            setattr(session, key, value)
+                # 会话在工作线程内打开和关闭，连接从连接池检出、用完归还
+                # 单条 UPDATE 语句，无需先 SELECT 再逐字段 setattr
+                with get_session() as db:
+                    db.query(TradingSession).filter_by(id=session_id).update(
+                        values, synchronize_session=False
+                    )
                     db.commit()
 
             await asyncio.to_thread(update)
+            self._invalidate_snapshot(session_id)
         except Exception as e:
             logger.error(f"更新会话状态失败: {e}", session_id=session_id)
-            try:
-                db.rollback()
-            except Exception:
-                pass
-        finally:
-            try:
-                db.close()
-            except Exception as close_error:
-                logger.debug(f"关闭数据库会话时出错: {close_error}")
     
     async def _get_session_status(self, session_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -1143,11 +1216,9 @@ class BackgroundAgentManager:
         Returns:
             会话状态字典
         """
-        db = next(get_db())
-        try:
-            def query():
-                from ..models.trading_session import TradingSession
-                session = db.query(TradingSession).filter_by(id=session_id).first()
+        def query():
+            with get_session() as db:
+                session = db.get(TradingSession, session_id)
                 if not session:
                     return None
                 
@@ -1162,16 +1233,12 @@ class BackgroundAgentManager:
                     'last_error': session.last_error,
                     'trading_params': session.trading_params
                 }
-            
+        
+        try:
             return await asyncio.to_thread(query)
         except Exception as e:
             logger.error(f"获取会话状态失败: {e}", session_id=session_id)
             return None
-        finally:
-            try:
-                db.close()
-            except Exception as close_error:
-                logger.debug(f"关闭数据库会话时出错: {close_error}")
     
     async def _increment_decision_count(self, session_id: int):
         """
@@ -1180,68 +1247,46 @@ class BackgroundAgentManager:
         Args:
             session_id: 会话 ID
         """
-        db = next(get_db())
+        # 计数在数据库端自增，与最后决策时间、错误清除合并为一条 UPDATE，无需先 SELECT
+        values = {
+            TradingSession.decision_count: func.coalesce(TradingSession.decision_count, 0) + 1,
+            TradingSession.last_decision_time: datetime.now(timezone.utc),
+            # 清除错误信息（成功执行后）
+            TradingSession.last_error: None
+        }
+
+        def update():
+            # 会话完全在工作线程内使用；任务被取消时线程仍会执行完并自行关闭会话
+            with get_session() as db:
+                db.query(TradingSession).filter_by(id=session_id).update(
+                    values, synchronize_session=False
+                )
+                db.commit()
+        
         try:
-            def update():
-                from ..models.trading_session import TradingSession
-                session = db.query(TradingSession).filter_by(id=session_id).first()
-                if session:
-                    session.decision_count = (session.decision_count or 0) + 1
-                    session.last_decision_time = datetime.now(timezone.utc)
-                    # 清除错误信息（成功执行后）
-                    session.last_error = None
-                    db.commit()
-            
             await asyncio.to_thread(update)
-        except asyncio.CancelledError:
-            # 任务被取消，安全地回滚并关闭数据库连接
-            try:
-                db.rollback()
-            except Exception as rollback_error:
-                logger.debug(f"回滚数据库失败: {rollback_error}")
-            raise  # 重新抛出 CancelledError
+            self._invalidate_snapshot(session_id)
         except Exception as e:
             logger.error(f"更新决策次数失败: {e}", session_id=session_id)
-            try:
-                db.rollback()
-            except Exception:
-                pass
-        finally:
-            try:
-                db.close()
-            except Exception as close_error:
-                logger.debug(f"关闭数据库会话时出错: {close_error}")
     
     async def _check_session_running(self, session_id: int) -> bool:
         """检查会话是否仍在运行"""
-        db = next(get_db())
-        try:
-            def query():
+        def query():
+            with get_session() as db:
                 session_repo = TradingSessionRepository(db)
                 session = session_repo.get_by_id(session_id)
                 return session is not None and session.status == 'running'
-            
+        
+        try:
             return await asyncio.to_thread(query)
         except Exception as e:
             logger.debug(f"检查会话状态失败: {e}", session_id=session_id)
             return False
-        finally:
-            try:
-                db.close()
-            except Exception as close_error:
-                logger.debug(f"关闭数据库会话时出错: {close_error}")
 
 
 # 全局单例
-_background_manager: Optional[BackgroundAgentManager] = None
-
-
+@lru_cache(maxsize=1)
 def get_background_agent_manager() -> BackgroundAgentManager:
     """获取后台 Agent 管理器单例"""
-    global _background_manager
-    
-    if _background_manager is None:
-        _background_manager = BackgroundAgentManager()
-    
-    return _background_manager
+    return BackgroundAgentManager()
 
@@ -19,6 +19,11 @@ from ..utils.exceptions import BusinessException
 logger = get_logger(__name__)
 
 
+def _optional_float(value: Any) -> Optional[float]:
+    """Decimal 字段转换为 float，None 保持为 None"""
+    return float(value) if value is not None else None
+
+
 class TradingSessionService:
     """交易会话服务"""
 
@@ -127,24 +132,19 @@ class TradingSessionService:
         # 使用初始资金作为最终资金（如果没有其他数据源）
         final_capital = session.initial_capital
 
-        # 更新会话
+        # 状态、统计信息和备注一次写入（一次提交）
+        extra = {key: value for key, value in statistics.items() if key != 'total_pnl'}
+        if notes:
+            extra['notes'] = notes
+        
         updated_session = self.session_repo.end_session(
             session_id=session_id,
             status=status,
             final_capital=final_capital,
-            total_pnl=statistics.get('total_pnl')
-        )
-        
-        # 更新统计信息
-        self.session_repo.update_statistics(
-            session_id=session_id,
-            **statistics
+            total_pnl=statistics.get('total_pnl'),
+            **extra
         )
         
-        # 更新备注
-        if notes:
-            self.session_repo.update(session_id, notes=notes)
-        
         logger.info(
             "交易会话已结束",
             session_id=session_id,
@@ -178,11 +178,11 @@ class TradingSessionService:
         # 获取交易
         trades = self.trade_repo.get_by_session(session_id)
 
-        # 获取 AI 决策
-        decisions = self.decision_repo.get_by_session(session_id)
+        # 获取 AI 决策（只加载摘要列）
+        decisions = self.decision_repo.get_summaries_by_session(session_id)
 
         # 计算 Hold Times（持仓时间占比）
-        hold_times = self._calculate_hold_times(session, trades)
+        hold_times = self._calculate_hold_times(session)
 
         # 反序列化 JSON 字段
         config = json.loads(session.config) if session.config else None
@@ -194,10 +194,10 @@ class TradingSessionService:
                 "status": session.status,
                 "created_at": session.created_at.isoformat(),
                 "ended_at": session.ended_at.isoformat() if session.ended_at else None,
-                "initial_capital": float(session.initial_capital) if session.initial_capital else None,
-                "final_capital": float(session.final_capital) if session.final_capital else None,
-                "total_pnl": float(session.total_pnl) if session.total_pnl else None,
-                "total_return_pct": float(session.total_return_pct) if session.total_return_pct else None,
+                "initial_capital": _optional_float(session.initial_capital),
+                "final_capital": _optional_float(session.final_capital),
+                "total_pnl": _optional_float(session.total_pnl),
+                "total_return_pct": _optional_float(session.total_return_pct),
                 "total_trades": session.total_trades,
                 "winning_trades": session.winning_trades,
                 "losing_trades": session.losing_trades,
@@ -222,15 +222,17 @@ class TradingSessionService:
                 }
                 for p in positions
             ],
+            # 交易和决策行的时间字段直接返回 datetime，由接口层的 orjson 序列化为 ISO 8601 字符串
             "trades": [
                 {
                     "id": t.id,
                     "symbol": t.symbol,
                     "side": t.side,
-                    "quantity": float(t.quantity) if t.quantity else 0,
-                    "price": float(t.price) if t.price else 0,
+                    # quantity/price 均为非空列
+                    "quantity": float(t.quantity),
+                    "price": float(t.price),
                     "order_type": t.order_type,
-                    "created_at": t.created_at.isoformat() if t.created_at else None,
+                    "created_at": t.created_at,
                 }
                 for t in trades
             ],
@@ -239,9 +241,9 @@ class TradingSessionService:
                     "id": d.id,
                     "decision_type": d.decision_type,
                     "symbols": json.loads(d.symbols) if d.symbols and isinstance(d.symbols, str) else (d.symbols or []),
-                    "confidence": float(d.confidence) if d.confidence else None,
+                    "confidence": _optional_float(d.confidence),
                     "reasoning": d.reasoning,
-                    "created_at": d.created_at.isoformat() if d.created_at else None
+                    "created_at": d.created_at
                 }
                 for d in decisions
             ],
@@ -259,10 +261,7 @@ class TradingSessionService:
         status: Optional[str] = None,
         limit: int = 20
     ) -> List[Dict[str, Any]]:
-        if status:
-            sessions = self.session_repo.get_by_status(status)[:limit]
-        else:
-            sessions = self.session_repo.get_latest_sessions(limit)
+        sessions = self.session_repo.get_summaries(status=status, limit=limit)
         
         return [
             {
@@ -271,10 +270,10 @@ class TradingSessionService:
                 "status": s.status,
                 "created_at": s.created_at.isoformat(),
                 "ended_at": s.ended_at.isoformat() if s.ended_at else None,
-                "initial_capital": float(s.initial_capital) if s.initial_capital else None,
-                "final_capital": float(s.final_capital) if s.final_capital else None,
-                "total_pnl": float(s.total_pnl) if s.total_pnl else None,
-                "total_return_pct": float(s.total_return_pct) if s.total_return_pct else None,
+                "initial_capital": _optional_float(s.initial_capital),
+                "final_capital": _optional_float(s.final_capital),
+                "total_pnl": _optional_float(s.total_pnl),
+                "total_return_pct": _optional_float(s.total_return_pct),
                 "total_trades": s.total_trades
             }
             for s in sessions
@@ -291,13 +290,12 @@ class TradingSessionService:
             "total_pnl": trade_stats["total_pnl"]
         }
 
-    def _calculate_hold_times(self, session: TradingSession, trades: List) -> Dict[str, float]:
+    def _calculate_hold_times(self, session: TradingSession) -> Dict[str, float]:
         """
         计算持仓时间占比
 
         Args:
             session: 交易会话
-            trades: 交易记录列表
 
         Returns:
             {
@@ -325,34 +323,14 @@ class TradingSessionService:
                 "flat_pct": 100.0
             }
 
-        # 统计各状态的持续时间
-        long_duration = 0.0
-        short_duration = 0.0
-
-        for trade in trades:
-            if not trade.entry_time or not trade.exit_time:
-                continue
-
-            # 确保时区一致
-            entry_time = trade.entry_time
-            exit_time = trade.exit_time
-
-            if entry_time.tzinfo is None:
-                entry_time = entry_time.replace(tzinfo=timezone.utc)
-            if exit_time.tzinfo is None:
-                exit_time = exit_time.replace(tzinfo=timezone.utc)
-
-            # 计算该交易的持续时间
-            duration = (exit_time - entry_time).total_seconds()
-
-            if trade.side == 'long':
-                long_duration += duration
-            elif trade.side == 'short':
-                short_duration += duration
+        # 各方向的持仓时长在数据库端按 holding_duration 汇总，覆盖全部交易而不只是最近的记录
+        hold_time_sums = self.trade_repo.get_hold_time_sums(session.id)
+        long_duration = hold_time_sums.get('long', 0)
+        short_duration = hold_time_sums.get('short', 0)
 
         # 计算百分比
-        long_pct = (long_duration / total_duration * 100) if total_duration > 0 else 0
-        short_pct = (short_duration / total_duration * 100) if total_duration > 0 else 0
+        long_pct = long_duration / total_duration * 100
+        short_pct = short_duration / total_duration * 100
         flat_pct = 100 - long_pct - short_pct
 
         # 确保百分比不为负数（可能因为重叠持仓）
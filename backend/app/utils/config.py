@@ -39,6 +39,8 @@ class Settings(BaseSettings):
     
     # 数据库配置 - 使用 SQLite（本地文件数据库）
     DATABASE_URL: str = "sqlite:///./data/trading.db"
+    DB_POOL_SIZE: int = 10  # 常驻连接数（线程池中的接口、后台 Agent 的数据库线程共用）
+    DB_MAX_OVERFLOW: int = 10  # 高峰时允许额外创建的连接数
     
     # CORS 配置
     CORS_ORIGINS: list = [
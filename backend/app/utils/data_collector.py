@@ -4,7 +4,10 @@
 创建时间: 2025-10-27
 修改时间: 2025-11-01 - 重构为工厂模式，统一架构
 """
-from functools import lru_cache
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, TypeVar
 
 from ..exchanges.factory import ExchangeFactory
 from ..exchanges.base import AbstractExchange
@@ -24,5 +27,28 @@ def get_exchange() -> AbstractExchange:
     Returns:
         交易所实例
     """
-    return ExchangeFactory.create_exchange()
+    # 与 AccountService 等使用的交易器共用同一实例（同一个 HTTP 连接池），
+    # 应用启动时预先创建，首个请求无需等待建立连接
+    return ExchangeFactory.get_trader()
 
+
+# 交易所同步调用专用线程池（行情、持仓、下单等 HTTP 请求）
+# 与数据库、LLM 等其他 to_thread 调用隔离，避免默认线程池被长时间的 LLM 请求占满时下单排队
+EXCHANGE_MAX_WORKERS = 8
+_EXCHANGE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=EXCHANGE_MAX_WORKERS,
+    thread_name_prefix='exchange'
+)
+
+T = TypeVar('T')
+
+
+async def run_exchange_call(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    在交易所专用线程池中执行同步调用，不阻塞事件循环
+    
+    用法：
+        ticker = await run_exchange_call(exchange.get_ticker, symbol)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_EXCHANGE_EXECUTOR, partial(func, *args, **kwargs))
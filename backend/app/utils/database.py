@@ -18,6 +18,16 @@ logger = get_logger(__name__)
 # SQLAlchemy Base
 Base = declarative_base()
 
+# 每个新连接执行的 SQLite 设置
+_SQLITE_PRAGMAS = """
+PRAGMA foreign_keys=ON;
+PRAGMA journal_mode=WAL;           -- 使用 WAL 模式提升性能
+PRAGMA synchronous=NORMAL;         -- WAL 模式下安全，提交时不再每次 fsync
+PRAGMA temp_store=MEMORY;          -- 排序、分组产生的临时表放在内存中
+PRAGMA cache_size=-20000;          -- 每个连接约 20MB 页缓存（默认约 2MB）
+PRAGMA mmap_size=268435456;        -- 256MB 内存映射读取，减少读操作的系统调用和拷贝
+"""
+
 # 数据库引擎（延迟初始化）
 engine = None
 SessionLocal = None
@@ -43,16 +53,16 @@ def init_db():
         engine = create_engine(
             settings.DATABASE_URL,
             connect_args={"check_same_thread": False},  # SQLite 多线程支持
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
             echo=False
         )
 
-        # 启用 SQLite 外键约束和 WAL 模式
+        # 启用 SQLite 外键约束、WAL 模式及读写性能相关设置
         @event.listens_for(engine, "connect")
         def set_sqlite_pragma(dbapi_conn, connection_record):
-            cursor = dbapi_conn.cursor()
-            cursor.execute("PRAGMA foreign_keys=ON")
-            cursor.execute("PRAGMA journal_mode=WAL")  # 使用 WAL 模式提升性能
-            cursor.close()
+            # 所有 PRAGMA 拼成一个脚本一次执行
+            dbapi_conn.executescript(_SQLITE_PRAGMAS)
 
         # 创建会话工厂
         SessionLocal = sessionmaker(
@@ -99,6 +109,10 @@ def _create_tables_if_not_exists():
             logger.info("✅ 数据库表创建成功")
         else:
             logger.info(f"✅ 数据库表已存在 ({len(existing_tables)} 个表)")
+            # create_all 不会为已存在的表补建索引，已有数据库在这里补建模型中新增的索引
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=engine, checkfirst=True)
 
     except Exception as e:
         logger.error(f"检查/创建数据库表失败: {str(e)}")
@@ -124,6 +138,22 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_session() -> Session:
+    """
+    获取独立的数据库会话（后台任务等非依赖注入场景用）
+    
+    用法：
+        with get_session() as db:
+            db.query(Item).all()
+    
+    退出 with 块时自动关闭会话，连接归还连接池
+    """
+    if SessionLocal is None:
+        raise RuntimeError("数据库未初始化，请先调用 init_db()")
+    
+    return SessionLocal()
+
+
 def create_tables():
     """
     创建所有表（开发环境用）
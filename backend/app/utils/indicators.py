@@ -14,6 +14,18 @@ from .logging import get_logger
 logger = get_logger(__name__)
 
 
+def _finite_or_zero(value: float) -> float:
+    """NaN 转换为 0.0（NaN 不等于自身，无需调用 pd.isna）"""
+    return float(value) if value == value else 0.0
+
+
+def _series_last(series: Optional[pd.Series]) -> float:
+    """取指标序列的最后一个值，序列为 None 或最后一个值为 NaN 时返回 0.0"""
+    if series is None:
+        return 0.0
+    return _finite_or_zero(series.to_numpy()[-1])
+
+
 class TechnicalIndicators:
     """技术指标计算器"""
     
@@ -38,26 +50,24 @@ class TechnicalIndicators:
         Returns:
             EMA值列表
         """
-        if len(closes) < period:
-            # 数据不足，返回0填充
-            return [0.0] * len(closes)
-        
-        result = []
+        # 结果列表一次分配好，按下标写入；前period-1个值保持0（因为还没有足够数据计算）
+        n = len(closes)
+        result = [0.0] * n
         
-        # 前period-1个值用0填充（因为还没有足够数据计算）
-        for i in range(period - 1):
-            result.append(0.0)
+        if n < period:
+            # 数据不足，返回0填充
+            return result
         
         # 计算初始EMA：使用前period个数据的SMA
         initial_sum = sum(closes[:period])
         ema = initial_sum / period
-        result.append(ema)
+        result[period - 1] = ema
         
         # 计算后续EMA值
         multiplier = 2.0 / (period + 1)
-        for i in range(period, len(closes)):
+        for i in range(period, n):
             ema = (closes[i] - ema) * multiplier + ema
-            result.append(ema)
+            result[i] = ema
         
         return result
     
@@ -72,19 +82,39 @@ class TechnicalIndicators:
         Returns:
             DataFrame with OHLCV columns
         """
-        df = pd.DataFrame(klines)
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('timestamp', inplace=True)
+        # 按列直接提取为 float64 数组再构造 DataFrame，
+        # 避免 pd.DataFrame(list[dict]) 逐行解析字典和推断类型
+        n = len(klines)
+        timestamps = np.fromiter((k['timestamp'] for k in klines), dtype=np.int64, count=n)
+        columns = {
+            # 确保列名符合pandas_ta的要求（小写）
+            key.lower(): np.fromiter((k[key] for k in klines), dtype=np.float64, count=n)
+            for key in klines[0]
+            if key != 'timestamp'
+        }
         
-        # 确保列名符合pandas_ta的要求（小写）
-        df.columns = [col.lower() for col in df.columns]
+        # 毫秒时间戳直接视为 datetime64[ms]（零拷贝），不经过 to_datetime 解析
+        index = pd.DatetimeIndex(timestamps.view('datetime64[ms]'), name='timestamp', copy=False)
+        return pd.DataFrame(columns, index=index)
+    
+    @staticmethod
+    def _timestamps_ms(df: pd.DataFrame) -> np.ndarray:
+        """
+        获取DataFrame索引对应的毫秒时间戳
         
-        return df
+        _klines_to_dataframe 按毫秒精度构造索引，asi8 直接返回底层的 int64 数据，不做转换；
+        其他精度的索引先换算为毫秒（pandas 3 的时间精度不再固定为纳秒，按纳秒整除会得到错误结果）
+        """
+        index = df.index
+        if index.unit != 'ms':
+            index = index.as_unit('ms')
+        return index.asi8
     
     def calculate_ema(
         self, 
         klines: List[Dict[str, Any]], 
-        periods: List[int] = [20, 50]
+        periods: List[int] = [20, 50],
+        df: Optional[pd.DataFrame] = None
     ) -> Dict[str, List[float]]:
         """
         计算EMA (指数移动平均线)
@@ -92,6 +122,7 @@ class TechnicalIndicators:
         Args:
             klines: K线数据
             periods: EMA周期列表
+            df: 已转换好的K线DataFrame（可选，不传则由 klines 转换）
             
         Returns:
             {
@@ -101,10 +132,11 @@ class TechnicalIndicators:
             }
         """
         try:
-            df = self._klines_to_dataframe(klines)
+            if df is None:
+                df = self._klines_to_dataframe(klines)
             
             result = {
-                'timestamps': df.index.astype(np.int64) // 10**6  # 转换为毫秒
+                'timestamps': self._timestamps_ms(df)
             }
             
             # 提取收盘价列表
@@ -114,7 +146,12 @@ class TechnicalIndicators:
                 # 使用手工实现的EMA计算（标准算法）
                 ema_values = self._calculate_ema_manual(closes, period)
                 result[f'ema{period}'] = ema_values
-                logger.debug(f"EMA{period} 计算完成，最新值: {ema_values[-1] if ema_values else 0:.2f}")
+                # 惰性求值：未启用 DEBUG 级别时不执行格式化
+                logger.opt(lazy=True).debug(
+                    "EMA{} 计算完成，最新值: {:.2f}",
+                    lambda: period,
+                    lambda: ema_values[-1] if ema_values else 0
+                )
             
             logger.info(f"成功计算 EMA，周期: {periods}")
             return result
@@ -129,7 +166,8 @@ class TechnicalIndicators:
         klines: List[Dict[str, Any]],
         fast: int = 12,
         slow: int = 26, 
-        signal: int = 9
+        signal: int = 9,
+        df: Optional[pd.DataFrame] = None
     ) -> Dict[str, List[float]]:
         """
         计算MACD指标
@@ -139,6 +177,7 @@ class TechnicalIndicators:
             fast: 快线周期
             slow: 慢线周期
             signal: 信号线周期
+            df: 已转换好的K线DataFrame（可选，不传则由 klines 转换）
             
         Returns:
             {
@@ -149,14 +188,15 @@ class TechnicalIndicators:
             }
         """
         try:
-            df = self._klines_to_dataframe(klines)
+            if df is None:
+                df = self._klines_to_dataframe(klines)
             
             # pandas_ta的MACD返回DataFrame，包含MACD、MACDh(histogram)、MACDs(signal)
             macd_df = ta.macd(df['close'], fast=fast, slow=slow, signal=signal)
             
             if macd_df is not None:
                 result = {
-                    'timestamps': df.index.astype(np.int64) // 10**6,
+                    'timestamps': self._timestamps_ms(df),
                     'macd': macd_df[f'MACD_{fast}_{slow}_{signal}'].fillna(0).tolist(),
                     'signal': macd_df[f'MACDs_{fast}_{slow}_{signal}'].fillna(0).tolist(),
                     'histogram': macd_df[f'MACDh_{fast}_{slow}_{signal}'].fillna(0).tolist(),
@@ -164,7 +204,7 @@ class TechnicalIndicators:
             else:
                 logger.warning("MACD计算返回None，返回默认值")
                 result = {
-                    'timestamps': df.index.astype(np.int64) // 10**6,
+                    'timestamps': self._timestamps_ms(df),
                     'macd': [0] * len(df),
                     'signal': [0] * len(df),
                     'histogram': [0] * len(df),
@@ -180,7 +220,8 @@ class TechnicalIndicators:
     def calculate_rsi(
         self, 
         klines: List[Dict[str, Any]], 
-        periods: List[int] = [7, 14]
+        periods: List[int] = [7, 14],
+        df: Optional[pd.DataFrame] = None
     ) -> Dict[str, List[float]]:
         """
         计算RSI (相对强弱指标)
@@ -188,6 +229,7 @@ class TechnicalIndicators:
         Args:
             klines: K线数据
             periods: RSI周期列表
+            df: 已转换好的K线DataFrame（可选，不传则由 klines 转换）
             
         Returns:
             {
@@ -197,10 +239,11 @@ class TechnicalIndicators:
             }
         """
         try:
-            df = self._klines_to_dataframe(klines)
+            if df is None:
+                df = self._klines_to_dataframe(klines)
             
             result = {
-                'timestamps': df.index.astype(np.int64) // 10**6
+                'timestamps': self._timestamps_ms(df)
             }
             
             for period in periods:
@@ -221,7 +264,8 @@ class TechnicalIndicators:
     def calculate_atr(
         self, 
         klines: List[Dict[str, Any]], 
-        periods: List[int] = [3, 14]
+        periods: List[int] = [3, 14],
+        df: Optional[pd.DataFrame] = None
     ) -> Dict[str, List[float]]:
         """
         计算ATR (平均真实波幅)
@@ -229,6 +273,7 @@ class TechnicalIndicators:
         Args:
             klines: K线数据
             periods: ATR周期列表
+            df: 已转换好的K线DataFrame（可选，不传则由 klines 转换）
             
         Returns:
             {
@@ -238,10 +283,11 @@ class TechnicalIndicators:
             }
         """
         try:
-            df = self._klines_to_dataframe(klines)
+            if df is None:
+                df = self._klines_to_dataframe(klines)
             
             result = {
-                'timestamps': df.index.astype(np.int64) // 10**6
+                'timestamps': self._timestamps_ms(df)
             }
             
             for period in periods:
@@ -277,20 +323,23 @@ class TechnicalIndicators:
         try:
             result = {}
             
+            # K线只转换一次DataFrame，各指标共用
+            df = self._klines_to_dataframe(klines)
+            
             # EMA
-            ema_data = self.calculate_ema(klines, periods=[20, 50])
+            ema_data = self.calculate_ema(klines, periods=[20, 50], df=df)
             result['ema'] = ema_data
             
             # MACD
-            macd_data = self.calculate_macd(klines)
+            macd_data = self.calculate_macd(klines, df=df)
             result['macd'] = macd_data
             
             # RSI
-            rsi_data = self.calculate_rsi(klines, periods=[7, 14])
+            rsi_data = self.calculate_rsi(klines, periods=[7, 14], df=df)
             result['rsi'] = rsi_data
             
             # ATR
-            atr_data = self.calculate_atr(klines, periods=[3, 14])
+            atr_data = self.calculate_atr(klines, periods=[3, 14], df=df)
             result['atr'] = atr_data
             
             # 添加时间戳（使用第一个计算的时间戳）
@@ -340,17 +389,23 @@ class TechnicalIndicators:
             atr3 = ta.atr(df['high'], df['low'], df['close'], length=3)
             atr14 = ta.atr(df['high'], df['low'], df['close'], length=14)
             
+            # MACD 的最后一行一次取出为 NumPy 数组，按列位置读取
+            macd_last = None
+            if macd_df is not None:
+                macd_cols = macd_df.columns.get_indexer(['MACD_12_26_9', 'MACDs_12_26_9', 'MACDh_12_26_9'])
+                macd_last = macd_df.to_numpy()[-1, macd_cols]
+            
             # 获取最新值
             result = {
                 'ema20': float(ema20_values[-1]) if ema20_values else 0.0,
                 'ema50': float(ema50_values[-1]) if ema50_values else 0.0,
-                'macd': float(macd_df['MACD_12_26_9'].iloc[-1]) if macd_df is not None and not pd.isna(macd_df['MACD_12_26_9'].iloc[-1]) else 0.0,
-                'signal': float(macd_df['MACDs_12_26_9'].iloc[-1]) if macd_df is not None and not pd.isna(macd_df['MACDs_12_26_9'].iloc[-1]) else 0.0,
-                'histogram': float(macd_df['MACDh_12_26_9'].iloc[-1]) if macd_df is not None and not pd.isna(macd_df['MACDh_12_26_9'].iloc[-1]) else 0.0,
-                'rsi7': float(rsi7.iloc[-1]) if rsi7 is not None and not pd.isna(rsi7.iloc[-1]) else 0.0,
-                'rsi14': float(rsi14.iloc[-1]) if rsi14 is not None and not pd.isna(rsi14.iloc[-1]) else 0.0,
-                'atr3': float(atr3.iloc[-1]) if atr3 is not None and not pd.isna(atr3.iloc[-1]) else 0.0,
-                'atr14': float(atr14.iloc[-1]) if atr14 is not None and not pd.isna(atr14.iloc[-1]) else 0.0,
+                'macd': _finite_or_zero(macd_last[0]) if macd_last is not None else 0.0,
+                'signal': _finite_or_zero(macd_last[1]) if macd_last is not None else 0.0,
+                'histogram': _finite_or_zero(macd_last[2]) if macd_last is not None else 0.0,
+                'rsi7': _series_last(rsi7),
+                'rsi14': _series_last(rsi14),
+                'atr3': _series_last(atr3),
+                'atr14': _series_last(atr14),
             }
             
             logger.info("成功获取最新指标值")
@@ -371,6 +426,11 @@ def get_indicators_calculator() -> TechnicalIndicators:
     return TechnicalIndicators()
 
 
+def _last_value(values: List[float]) -> float:
+    """取序列的最后一个值，序列为空时返回 0.0（序列中的缺失值已填充为 0）"""
+    return float(values[-1]) if len(values) else 0.0
+
+
 def calculate_indicators(klines: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     计算所有技术指标的辅助函数
@@ -386,8 +446,21 @@ def calculate_indicators(klines: List[Dict[str, Any]]) -> Dict[str, Any]:
     # 计算所有指标
     all_indicators = calculator.calculate_all_indicators(klines)
     
-    # 获取最新值
-    latest_values = calculator.get_latest_values(klines)
+    # 最新值直接取完整序列的最后一个元素，不再调用 get_latest_values 重复计算一遍
+    latest_values = {
+        name: _last_value(all_indicators[group][key])
+        for name, group, key in (
+            ('ema20', 'ema', 'ema20'),
+            ('ema50', 'ema', 'ema50'),
+            ('macd', 'macd', 'macd'),
+            ('signal', 'macd', 'signal'),
+            ('histogram', 'macd', 'histogram'),
+            ('rsi7', 'rsi', 'rsi7'),
+            ('rsi14', 'rsi', 'rsi14'),
+            ('atr3', 'atr', 'atr3'),
+            ('atr14', 'atr', 'atr14'),
+        )
+    }
     
     return {
         'all_indicators': all_indicators,
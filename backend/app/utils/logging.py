@@ -4,11 +4,48 @@
 创建时间: 2025-10-27
 """
 import sys
+import traceback
 from pathlib import Path
+import orjson
 from loguru import logger
 
 from .config import settings
 
+def _json_format(record) -> str:
+    """
+    JSON 日志格式（orjson 序列化）
+
+    Loguru 的 serialize=True 在写日志的线程中用标准库 json 序列化整条记录，
+    这里改为 orjson 只序列化常用字段，异常时附带完整堆栈。
+    返回值会被 Loguru 当作格式模板解析：花括号需要转义；"<" 会被当作颜色标签，
+    改写为等价的 JSON 转义 \\u003c。不修改 record，其他 sink 看到的记录保持原样
+    """
+    exception = record["exception"]
+    payload = orjson.dumps(
+        {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "name": record["name"],
+            "function": record["function"],
+            "line": record["line"],
+            "message": record["message"],
+            "extra": record["extra"],
+            "exception": (
+                {
+                    "type": exception.type.__name__,
+                    "value": str(exception.value),
+                    "traceback": "".join(traceback.format_exception(
+                        exception.type, exception.value, exception.traceback
+                    )),
+                }
+                if exception and exception.type else None
+            ),
+        },
+        default=str,
+    ).decode()
+    return payload.replace("<", "\\u003c").replace("{", "{{").replace("}", "}}") + "\n"
+
+
 def setup_logging():
     """
     配置应用日志系统
@@ -79,14 +116,14 @@ def setup_logging():
         compression="zip",
         enqueue=True,
         level="INFO",
-        serialize=True,  # JSON 格式
+        format=_json_format,  # JSON 格式
     )
     
-    logger.info("日志系统初始化完成")
-    logger.info(f"应用名称: {settings.APP_NAME}")
-    logger.info(f"应用版本: {settings.VERSION}")
-    logger.info(f"调试模式: {settings.DEBUG}")
-    logger.info(f"日志级别: {settings.LOG_LEVEL}")
+    # 启动信息合并为一条日志
+    logger.info(
+        f"日志系统初始化完成 | 应用名称: {settings.APP_NAME} | 应用版本: {settings.VERSION} | "
+        f"调试模式: {settings.DEBUG} | 日志级别: {settings.LOG_LEVEL}"
+    )
     
     return logger
 
@@ -0,0 +1,11 @@
+-- 数据库迁移脚本
+-- 功能：将 trades / ai_decisions 的 session_id 单列索引替换为 (session_id, created_at) 复合索引
+-- 日期：2025-11-15
+-- 说明：会话详情、决策记录、资产时序等查询都是按会话过滤后按时间排序，
+--       复合索引可直接按索引顺序返回结果，无需额外排序；仅按 session_id 过滤的查询同样可以使用
+
+CREATE INDEX IF NOT EXISTS idx_trade_session_created ON trades(session_id, created_at);
+DROP INDEX IF EXISTS idx_trade_session;
+
+CREATE INDEX IF NOT EXISTS idx_decision_session_created ON ai_decisions(session_id, created_at);
+DROP INDEX IF EXISTS idx_decision_session;
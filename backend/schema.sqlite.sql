@@ -97,7 +97,7 @@ CREATE TABLE ai_decisions (
 );
 
 -- 索引
-CREATE INDEX idx_decision_session ON ai_decisions(session_id);
+CREATE INDEX idx_decision_session_created ON ai_decisions(session_id, created_at);
 CREATE INDEX idx_decision_created_at ON ai_decisions(created_at);
 CREATE INDEX idx_decision_executed ON ai_decisions(executed);
 
@@ -154,7 +154,7 @@ CREATE TABLE trades (
 );
 
 -- 索引
-CREATE INDEX idx_trade_session ON trades(session_id);
+CREATE INDEX idx_trade_session_created ON trades(session_id, created_at);
 CREATE INDEX idx_trade_symbol_created ON trades(symbol, created_at);
 CREATE INDEX idx_trade_created_at ON trades(created_at);
 CREATE INDEX idx_trade_entry_time ON trades(entry_time);